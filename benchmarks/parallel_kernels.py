@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the throughput of the serial and multithreaded array kernels
+with respect to the number of threads. Run as a script:
+
+    python benchmarks/parallel_kernels.py [size]
+
+"""
+import sys
+from time import perf_counter
+import numpy as np
+import numba
+from flexsolve import utils
+
+def best_time(f, args, repeat=5):
+    f(*args) # Compile
+    times = []
+    for i in range(repeat):
+        t = perf_counter()
+        f(*args)
+        times.append(perf_counter() - t)
+    return min(times)
+
+def kernel_arguments(size):
+    rng = np.random.default_rng(0)
+    x = rng.random(size)
+    dx = rng.random(size) - 0.5
+    g1 = rng.random(size)
+    g0 = rng.random(size)
+    error = np.full(size, 1e-9)
+    return {
+        'converged': (utils.parallel_array_fixedpoint_converged,
+                      (x, error, 1e-8, 0.)),
+        'wegstein': (utils.parallel_array_wegstein_iter,
+                     (x, dx, g1, g0, -float('inf'), float('inf'), 1.)),
+        'aitken': (utils.parallel_array_aitken_iter,
+                   (x, g1, dx, g0)),
+    }
+
+def main(size=10**7):
+    kernels = kernel_arguments(size)
+    max_threads = numba.config.NUMBA_NUM_THREADS
+    threads = sorted({1, *[2 ** i for i in range(max_threads.bit_length())], max_threads})
+    threads = [i for i in threads if i <= max_threads]
+    print(f'size: {size:,}; available threads: {max_threads}')
+    print(f"{'kernel':<12}" + ''.join([f'{i:>12} thr' for i in threads]) + '   [Melem/s]')
+    for name, (kernel, args) in kernels.items():
+        rates = []
+        for n in threads:
+            numba.set_num_threads(n)
+            rates.append(size / best_time(kernel, args) / 1e6)
+        print(f"{name:<12}" + ''.join([f'{i:>16.1f}' for i in rates]))
+    numba.set_num_threads(max_threads)
+
+if __name__ == '__main__':
+    main(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**7)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel drivers for solving batches of independent scalar problems
+with compiled objective functions.
+
+"""
+import numpy as np
+from numba import njit, prange
+from . import utils
+from .open_solvers import secant, aitken_secant
+from .bounded_solvers import (
+    IQ_interpolation, false_position, bisection, chandrupatla, ITP
+)
+
+__all__ = ('solve_batch',)
+
+open_solvers = (secant, aitken_secant)
+bounded_solvers = (IQ_interpolation, false_position, bisection, chandrupatla, ITP)
+compiled_drivers = {}
+
+def compile_driver(solver, f, has_args):
+    if has_args:
+        @njit
+        def objective(x, row): return f(x, row)
+    else:
+        @njit
+        def objective(x, row): return f(x)
+
+    @njit
+    def counted_objective(x, row, evaluations, last, i):
+        evaluations[i] += 1
+        last[i] = x
+        return objective(x, row)
+
+    CONVERGED = utils.CONVERGED
+    MAXITER_EXCEEDED = utils.MAXITER_EXCEEDED
+    INVALID_BRACKET = utils.INVALID_BRACKET
+    if solver in bounded_solvers:
+        @njit
+        def solve(x0, x1, xtol, ytol, maxiter, checkroot, row, evaluations, last, i):
+            args = (row, evaluations, last, i)
+            y0 = counted_objective(x0, *args)
+            y1 = counted_objective(x1, *args)
+            if y0 * y1 > 0.: return np.nan, INVALID_BRACKET
+            try:
+                x = solver(counted_objective, x0, x1, y0, y1, None, xtol, ytol,
+                           args, maxiter, checkroot, True, False)
+            except Exception:
+                return last[i], MAXITER_EXCEEDED
+            else:
+                return x, CONVERGED
+    elif solver in open_solvers:
+        @njit
+        def solve(x0, x1, xtol, ytol, maxiter, checkroot, row, evaluations, last, i):
+            args = (row, evaluations, last, i)
+            try:
+                x = solver(counted_objective, x0, x1, xtol, ytol,
+                           args, maxiter, checkroot, True)
+            except Exception:
+                return last[i], MAXITER_EXCEEDED
+            else:
+                return x, CONVERGED
+    else:
+        raise ValueError(f'solver {solver} is not supported; only '
+                         f'{[i.__name__ for i in open_solvers + bounded_solvers]} are valid')
+    
+    @njit(parallel=True, nogil=True)
+    def driver(x0s, x1s, args_array, xtol, ytol, maxiter, checkroot,
+               roots, evaluations, status):
+        last = np.empty(x0s.size)
+        for i in prange(x0s.size):
+            roots[i], status[i] = solve(x0s[i], x1s[i], xtol, ytol, maxiter, checkroot,
+                                        args_array[i], evaluations, last, i)
+    
+    return driver
+
+def solve_batch(solver, f, x0s, x1s=None, args_array=None, xtol=0., ytol=5e-8,
+                maxiter=50, checkroot=False, roots=None, evaluations=None, status=None):
+    """
+    Solve a batch of independent scalar problems in parallel with a
+    jitable solver (`secant`, `aitken_secant`, `IQ_interpolation`,
+    `false_position`, `bisection`, `chandrupatla`, or `ITP`).
+
+    The objective function must be compiled with numba (e.g., `@njit`)
+    and is called as `f(x, args_array[i])` for each problem, `i`,
+    or `f(x)` if no `args_array` is given. The batch is solved within a
+    compiled `numba.prange` loop which releases the GIL.
+
+    Parameters
+    ----------
+    solver : function
+        Jitable open or bounded solver.
+    f : function
+        Compiled objective function.
+    x0s, x1s : 1d array
+        Root brackets for bounded solvers or initial and second guesses
+        for open solvers (`x1s` is optional for open solvers).
+    args_array : 2d array, optional
+        Row `i` is passed as the argument of `f` for problem `i`.
+    roots, evaluations, status : 1d array, optional
+        Preallocated output arrays (float, int, and int, respectively).
+
+    Returns
+    -------
+    roots : 1d array
+        Solution of each problem (or the last value tried if it did not converge).
+    evaluations : 1d array
+        Number of function evaluations of each problem.
+    status : 1d array
+        `utils.CONVERGED`, `utils.MAXITER_EXCEEDED` (i.e., not converged), or
+        `utils.INVALID_BRACKET` for each problem.
+
+    """
+    x0s = np.asarray(x0s, dtype=float).ravel()
+    size = x0s.size
+    if x1s is None:
+        if solver in bounded_solvers: raise ValueError('bounded solvers require x1s')
+        x1s = x0s + 1e-5
+    else:
+        x1s = np.asarray(x1s, dtype=float).ravel()
+    has_args = args_array is not None
+    if has_args:
+        args_array = np.asarray(args_array, dtype=float).reshape([size, -1])
+    else:
+        args_array = np.zeros((size, 0))
+    key = (solver, f, has_args)
+    if key in compiled_drivers:
+        driver = compiled_drivers[key]
+    else:
+        compiled_drivers[key] = driver = compile_driver(solver, f, has_args)
+    if roots is None: roots = np.empty(size)
+    if evaluations is None:
+        evaluations = np.zeros(size, dtype=np.int64)
+    else:
+        evaluations[:] = 0
+    if status is None: status = np.empty(size, dtype=np.int64)
+    driver(x0s, x1s, args_array, xtol, ytol, maxiter, checkroot,
+           roots, evaluations, status)
+    return roots, evaluations, status
@@ -6,13 +6,18 @@ Created on Tue Jul  9 00:35:01 2019
 """
 from typing import Callable, Any, Tuple, Optional
 from numba.extending import register_jitable
+from math import ceil, log2
 import numpy as np
 from . import utils
 __all__ = (
     'false_position', 
     'bisection', 
     'IQ_interpolation', 
-    'find_bracket'
+    'chandrupatla',
+    'ITP',
+    'find_bracket',
+    'batch_IQ_interpolation',
+    'batch_find_bracket',
 )
 
 # %% Tools
@@ -191,6 +196,7 @@ def IQ_interpolation(
     """Inverse quadratic interpolation solver."""
     if checkroot: utils.check_tols(xtol, ytol)
     abs_ = abs
+    y = 0.
     if x is None:
         guess_x = True
         x = 1e32
@@ -237,3 +243,377 @@ def IQ_interpolation(
         y = f(x, *args)
     if checkiter: utils.raise_iter_error()
     return x
+
+
+@register_jitable(cache=True)
+def chandrupatla(
+        f: Callable,
+        x0: float, 
+        x1: float, 
+        y0: Optional[float]=None, 
+        y1: Optional[float]=None, 
+        x: Optional[float]=None,
+        xtol: float=0.,
+        ytol: float=5e-8,
+        args: Tuple[Any, ...]=(), 
+        maxiter: int=50,
+        checkroot: bool=False, 
+        checkiter: bool=True, 
+        checkbounds: bool=True) -> float:
+    """Chandrupatla's solver (inverse quadratic interpolation safeguarded by bisection)."""
+    if checkroot: utils.check_tols(xtol, ytol)
+    abs_ = abs
+    if x is None:
+        guess_x = True
+        x = 1e32
+    else:
+        guess_x = utils.not_within_bounds(x, x0, x1)
+    if y0 is None: y0 = f(x0, *args)
+    if not checkroot and abs_(y0) < ytol or y0 == 0: return x0 # Lucky guess
+    if y1 is None: y1 = f(x1, *args)
+    if not checkroot and abs_(y1) < ytol or y1 == 0: return x1 # Lucky guess
+    if checkbounds: utils.check_bounds(y0, y1)
+    if guess_x: x = utils.false_position_iter(x0, x1, x1 - x0, y0, y1, -y0, x0)
+    a = c = x1
+    ya = yc = y1
+    b = x0
+    yb = y0
+    t = (x - a) / (b - a)
+    for iter in range(maxiter):
+        x = a + t * (b - a)
+        y = f(x, *args)
+        if (y > 0.) == (ya > 0.):
+            c = a
+            yc = ya
+        else:
+            c = b
+            yc = yb
+            b = a
+            yb = ya
+        a = x
+        ya = y
+        if abs_(ya) < abs_(yb):
+            x = a
+            y = ya
+        else:
+            x = b
+            y = yb
+        if y == 0.: return x
+        xtol_satisfied = abs_(b - a) < xtol
+        ytol_satisfied = abs_(y) < ytol
+        if checkroot:
+            if ytol_satisfied and xtol_satisfied:
+                return x
+        elif xtol_satisfied or ytol_satisfied:
+             return x
+        dx = abs_(b - c)
+        tlim = (4.4e-16 * abs_(x) + 0.5 * xtol) / dx if dx else 0.5
+        if tlim > 0.5: tlim = 0.5
+        xi = (a - b) / (c - b) if c != b else 0.
+        phi = (ya - yb) / (yc - yb) if yc != yb else 0.
+        if phi * phi < xi and (1. - phi) * (1. - phi) < 1. - xi:
+            t = ya / (yb - ya) * yc / (yb - yc) + (c - a) / (b - a) * ya / (yc - ya) * yb / (yc - yb)
+        else:
+            t = 0.5
+        if t < tlim: t = tlim
+        elif t > 1. - tlim: t = 1. - tlim
+    if checkiter: utils.raise_iter_error()
+    return x
+
+@register_jitable(cache=True)
+def ITP(
+        f: Callable,
+        x0: float, 
+        x1: float, 
+        y0: Optional[float]=None, 
+        y1: Optional[float]=None, 
+        x: Optional[float]=None,
+        xtol: float=0.,
+        ytol: float=5e-8,
+        args: Tuple[Any, ...]=(), 
+        maxiter: int=50,
+        checkroot: bool=False, 
+        checkiter: bool=True, 
+        checkbounds: bool=True,
+        k1: Optional[float]=None,
+        k2: float=2.,
+        n0: int=1) -> float:
+    """
+    Interpolate-truncate-project (ITP) solver. The number of iterations 
+    to satisfy `xtol` never exceeds that of bisection by more than `n0`.
+    
+    """
+    if checkroot: utils.check_tols(xtol, ytol)
+    abs_ = abs
+    if y0 is None: y0 = f(x0, *args)
+    if not checkroot and abs_(y0) < ytol or y0 == 0: return x0 # Lucky guess
+    if y1 is None: y1 = f(x1, *args)
+    if not checkroot and abs_(y1) < ytol or y1 == 0: return x1 # Lucky guess
+    if x1 < x0: x1, y1, x0, y0 = x0, y0, x1, y1
+    if checkbounds: utils.check_bounds(y0, y1)
+    dx = x1 - x0
+    if k1 is None: k1 = 0.2 / dx
+    if xtol > 0.:
+        eps = 0.5 * xtol
+    else:
+        eps = 2.2e-16 * max(abs_(x0), abs_(x1))
+        if eps == 0.: eps = 1e-300
+    nmax = ceil(log2(dx / (2. * eps))) + n0 if dx > 2. * eps else n0
+    # Project within a slightly smaller radius so that round-off in 
+    # iterates cannot leave the bracket wider than 2 * eps after nmax steps
+    # (the margin is kept small relative to eps to preserve the slack of n0)
+    eps -= min(8.8e-16 * max(abs_(x0), abs_(x1)), 0.1 * eps)
+    positive = y1 > 0.
+    bisect = utils.bisect
+    not_within_bounds = utils.not_within_bounds
+    guess_x = x is None or not_within_bounds(x, x0, x1)
+    for iter in range(maxiter):
+        x_half = bisect(x0, x1)
+        r = eps * 2. ** (nmax - iter) - 0.5 * dx
+        if guess_x:
+            # Interpolate
+            x_f = (y1 * x0 - y0 * x1) / (y1 - y0) if y1 != y0 else x_half
+            # Truncate
+            delta = k1 * dx ** k2
+            sigma = 1. if x_half > x_f else -1.
+            x = x_f + sigma * delta if delta <= abs_(x_half - x_f) else x_half
+        else:
+            guess_x = True
+            sigma = 1. if x_half > x else -1.
+        # Project
+        if abs_(x - x_half) > r: x = x_half - sigma * r
+        y = f(x, *args)
+        if (y > 0.) == positive:
+            x1 = x
+            y1 = y
+        else:
+            x0 = x
+            y0 = y
+        if y == 0.: return x
+        dx = x1 - x0
+        xtol_satisfied = dx < xtol
+        ytol_satisfied = abs_(y) < ytol
+        if checkroot:
+            if ytol_satisfied and xtol_satisfied:
+                return x
+        elif xtol_satisfied or ytol_satisfied:
+             return x
+    if checkiter: utils.raise_iter_error()
+    return x
+    
+# %% Batch tools
+
+def batch_find_bracket(
+        f: Callable, 
+        x0: np.ndarray,
+        x1: np.ndarray,
+        y0: Optional[np.ndarray]=None, 
+        y1: Optional[np.ndarray]=None,
+        args: Tuple[Any, ...]=(),
+        maxiter: int=50,
+        tol: float=5e-8,
+        checkiter: bool=True) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return brackets where the objective function, `f`, is certain to have
+    a root for a batch of independent starting intervals.
+    
+    The objective function is called as `f(x, index, *args)`, where `x` holds 
+    the values of the lanes that are still searching and `index` holds their
+    position in the batch. Lanes are frozen as soon as a sign change is found.
+    The returned `y0` and `y1` can be passed to `batch_IQ_interpolation` to 
+    avoid reevaluating the bracket. If `checkiter` is False, lanes without
+    a bracket are returned as is (`batch_IQ_interpolation` flags them with 
+    `utils.INVALID_BRACKET`).
+    
+    """
+    where = np.where
+    isfinite = np.isfinite
+    x0 = np.array(x0, dtype=float).ravel()
+    x1 = np.array(x1, dtype=float).ravel()
+    size = x0.size
+    lanes = np.arange(size)
+    y0 = f(x0, lanes, *args) if y0 is None else np.array(y0, dtype=float).ravel()
+    y1 = f(x1, lanes, *args) if y1 is None else np.array(y1, dtype=float).ravel()
+    searching = np.ones(size, bool)
+    for iter in range(maxiter):
+        index = lanes[searching]
+        if not index.size: break
+        a = x0[index]
+        b = x1[index]
+        ya = y0[index]
+        yb = y1[index]
+        swap = yb < ya
+        a, b = where(swap, b, a), where(swap, a, b)
+        ya, yb = where(swap, yb, ya), where(swap, ya, yb)
+        dx = b - a
+        finite = isfinite(ya) & isfinite(yb)
+        done = np.zeros(index.size, bool)
+        done[finite] = (ya[finite] * yb[finite] <= 0.) | (np.abs(dx[finite]) < tol)
+        # Extrapolate towards the root
+        extrapolate = finite & ~done & (yb != ya)
+        moved = np.zeros(index.size, bool)
+        if extrapolate.any():
+            mask = extrapolate.copy()
+            x = a[mask] - 2. * yb[mask] * dx[mask] / (yb[mask] - ya[mask])
+            y = f(x, index[mask], *args)
+            upper = yb[mask] < y
+            lower = ~upper & (y < ya[mask])
+            b[mask] = where(upper, x, b[mask])
+            yb[mask] = where(upper, y, yb[mask])
+            a[mask] = where(lower, x, a[mask])
+            ya[mask] = where(lower, y, ya[mask])
+            moved[mask] = upper | lower
+        # Expand bracket or bisect non-finite values
+        expand_upper = finite & ~done & ~moved & (yb < 0.)
+        expand_lower = finite & ~done & ~moved & ~expand_upper & (ya > 0.)
+        nonfinite = ~finite
+        mask = expand_upper | expand_lower | nonfinite
+        if mask.any():
+            x = where(expand_upper, b + 2. * dx, where(expand_lower, a - 2. * dx, 0.5 * (a + b)))[mask]
+            y = f(x, index[mask], *args)
+            xs = np.zeros(index.size)
+            ys = np.zeros(index.size)
+            xs[mask] = x
+            ys[mask] = y
+            upper = expand_upper | nonfinite & (ys > 0.)
+            lower = expand_lower | nonfinite & ~(ys > 0.)
+            b = where(upper, xs, b)
+            yb = where(upper, ys, yb)
+            a = where(lower, xs, a)
+            ya = where(lower, ys, ya)
+        x0[index] = a
+        x1[index] = b
+        y0[index] = ya
+        y1[index] = yb
+        searching[index[done]] = False
+    if searching.any():
+        if checkiter: raise RuntimeError('failed to find bracket')
+    return (x0, x1, y0, y1)
+    
+# %% Batch solvers
+
+def batch_IQ_interpolation(
+        f: Callable,
+        x0: np.ndarray, 
+        x1: np.ndarray, 
+        y0: Optional[np.ndarray]=None, 
+        y1: Optional[np.ndarray]=None, 
+        x: Optional[np.ndarray]=None,
+        xtol: float=0.,
+        ytol: float=5e-8,
+        args: Tuple[Any, ...]=(), 
+        maxiter: int=50,
+        checkroot: bool=False, 
+        checkiter: bool=False, 
+        checkbounds: bool=False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Inverse quadratic interpolation solver for a batch of independent roots.
+    
+    Each lane of `x0` and `x1` is a root bracket. The objective function is 
+    called as `f(x, index, *args)`, where `x` holds the values of the lanes 
+    that have not converged and `index` holds their position in the batch;
+    it must return one residual per lane. Return the roots, the number of 
+    iterations, and the status code of each lane (`utils.CONVERGED`, 
+    `utils.MAXITER_EXCEEDED`, or `utils.INVALID_BRACKET`).
+    
+    """
+    if checkroot: utils.check_tols(xtol, ytol)
+    abs_ = np.abs
+    where = np.where
+    x0 = np.array(x0, dtype=float).ravel()
+    x1 = np.array(x1, dtype=float).ravel()
+    size = x0.size
+    index = np.arange(size)
+    y0 = f(x0, index, *args) if y0 is None else np.array(y0, dtype=float).ravel()
+    y1 = f(x1, index, *args) if y1 is None else np.array(y1, dtype=float).ravel()
+    if checkroot:
+        solved = lambda y: y == 0.
+    else:
+        solved = lambda y: (abs_(y) < ytol) | (y == 0.)
+    roots = np.full(size, np.nan)
+    iterations = np.zeros(size, int)
+    status = np.full(size, utils.MAXITER_EXCEEDED)
+    done = solved(y0)
+    roots[done] = x0[done] # Lucky guess
+    lucky = ~done & solved(y1)
+    roots[lucky] = x1[lucky] # Lucky guess
+    done |= lucky
+    status[done] = utils.CONVERGED
+    swap = y1 < 0.
+    x0, x1 = where(swap, x1, x0), where(swap, x0, x1)
+    y0, y1 = where(swap, y1, y0), where(swap, y0, y1)
+    invalid = ~done & (y0 * y1 > 0.)
+    if invalid.any():
+        if checkbounds: raise ValueError('f(x0) and f(x1) must have opposite signs')
+        status[invalid] = utils.INVALID_BRACKET
+        done |= invalid
+    active = ~done
+    index = index[active]
+    if not index.size: return roots, iterations, status
+    x0 = x0[active]
+    x1 = x1[active]
+    y0 = y0[active]
+    y1 = y1[active]
+    df0 = -y0
+    dx = x1 - x0
+    guess = utils.array_false_position_iter(x0, x1, dx, y0, y1, df0, x0)
+    if x is not None:
+        x = np.broadcast_to(np.asarray(x, dtype=float).ravel(), (size,))[index]
+        guess = where((x0 < x) & (x < x1) | (x1 < x) & (x < x0), x, guess)
+    x = guess
+    y = f(x, index, *args)
+    converged = solved(y) # Lucky guess
+    for iter in range(maxiter):
+        if converged.any():
+            roots[index[converged]] = x[converged]
+            status[index[converged]] = utils.CONVERGED
+            active = ~converged
+            index = index[active]
+            if not index.size: break
+            x = x[active]
+            y = y[active]
+            x0 = x0[active]
+            x1 = x1[active]
+            y0 = y0[active]
+            y1 = y1[active]
+        iterations[index] += 1
+        positive = y > 0.
+        x2 = where(positive, x1, x0)
+        y2 = where(positive, y1, y0)
+        x1 = where(positive, x, x1)
+        y1 = where(positive, y, y1)
+        x0 = where(positive, x0, x)
+        y0 = where(positive, y0, y)
+        dx = x1 - x0
+        xtol_satisfied = abs_(dx) < xtol
+        ytol_satisfied = abs_(y) < ytol
+        if checkroot:
+            converged = xtol_satisfied & ytol_satisfied
+        else:
+            converged = xtol_satisfied | ytol_satisfied
+        if converged.any():
+            roots[index[converged]] = x[converged]
+            status[index[converged]] = utils.CONVERGED
+            active = ~converged
+            index = index[active]
+            if not index.size: break
+            x = x[active]
+            x0 = x0[active]
+            x1 = x1[active]
+            x2 = x2[active]
+            y0 = y0[active]
+            y1 = y1[active]
+            y2 = y2[active]
+            dx = dx[active]
+        x = utils.array_IQ_iter(y0, y1, y2, x0, x1, x2, dx, -y0, x)
+        y = f(x, index, *args)
+        converged = y == 0.
+    else:
+        if converged.any():
+            roots[index[converged]] = x[converged]
+            status[index[converged]] = utils.CONVERGED
+            index = index[~converged]
+            x = x[~converged]
+        roots[index] = x
+        if checkiter and index.size: utils.raise_iter_error()
+    return roots, iterations, status
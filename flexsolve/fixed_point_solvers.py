@@ -7,6 +7,7 @@ Created on Tue Apr 28 16:56:59 2020
 import numpy as np
 from numba.extending import register_jitable
 from . import utils
+from .line_search import exact_line_search, inexact_line_search, backtracking_line_search
 
 
 __all__ = ('fixed_point',
@@ -15,6 +16,12 @@ __all__ = ('fixed_point',
            'conditional_wegstein',
            'aitken',
            'conditional_aitken',
+           'anderson',
+           'GPacceleration',
+           'broyden',
+           'newton_krylov',
+           'batch_wegstein',
+           'batch_aitken',
 ) 
 
 iteration_history = []
@@ -25,59 +32,125 @@ class CachedFunction:
     def __init__(self, f, inputs=None, outputs=None):
         self.f = f
         self.inputs = [] if inputs is None else inputs
-        self.outputs = [] if inputs is None else outputs
+        self.outputs = [] if outputs is None else outputs
         
     def __call__(self, x, *args, **kwargs):
-        self.inputs.append(x)
         y = self.f(x, *args, **kwargs)
+        self.inputs.append(x)
         self.outputs.append(y)
         return y
 
-def GPiteration():
-    pass
+def GPiteration(f, x, args, memory, bounds):
+    """
+    Return f(x) and the next iterate proposed by a surrogate model of f fitted
+    to the last `memory` evaluations. The surrogate is a Gaussian process (GP) 
+    with a squared exponential kernel whose prior mean is the affine 
+    (multisecant) model of f through the latest evaluation. The next iterate 
+    is the fixed point of the surrogate, which is solved by Newton iterations 
+    using the Jacobian of the affine model.
+    
+    """
+    g = f(x, *args)
+    inputs = f.inputs
+    outputs = f.outputs
+    if len(inputs) > memory:
+        del inputs[:-memory]
+        del outputs[:-memory]
+    k = len(inputs)
+    shape = np.shape(g)
+    g_flat = np.array(g, dtype=float).ravel()
+    x_next = g_flat
+    if k > 1:
+        X = np.array([np.ravel(i) for i in inputs], dtype=float)
+        G = np.array([np.ravel(i) for i in outputs], dtype=float)
+        xk = X[-1]
+        gk = G[-1]
+        dX = (X[:-1] - xk).T
+        dG = (G[:-1] - gk).T
+        try:
+            # Affine model: m(x) = gk + A @ (x - xk), where A = dG @ P
+            P = np.linalg.pinv(dX, rcond=1e-10)
+            M = gk + (X - xk) @ P.T @ dG.T
+            # GP correction
+            # Squared distances from the Gram matrix (avoids k x k x n temporaries)
+            sq = np.einsum('ij,ij->i', X, X)
+            D2 = np.maximum(sq[:, None] + sq[None, :] - 2. * (X @ X.T), 0.)
+            np.fill_diagonal(D2, 0.)
+            distances = np.sqrt(D2)
+            nonzero = distances[distances > 0.]
+            length = np.median(nonzero) if nonzero.size else 1.
+            kernel = lambda D2: np.exp(-0.5 * D2 / (length * length))
+            K = kernel(D2) + 1e-10 * np.eye(k)
+            alpha = np.linalg.solve(K, G - M)
+            def surrogate(x):
+                D2 = ((X - x) ** 2).sum(-1)
+                return gk + dG @ (P @ (x - xk)) + kernel(D2) @ alpha
+            # Newton iterations on the surrogate: (I - A)^-1 = I + dG (I - P dG)^-1 P
+            inner = np.linalg.inv(np.eye(k - 1) - P @ dG)
+            x = g_flat
+            for i in range(20):
+                r = surrogate(x) - x
+                dx = r + dG @ (inner @ (P @ r))
+                x = x + dx
+                if np.abs(dx).max() <= 1e-12 * (1. + np.abs(x).max()): break
+            if np.isfinite(x).all(): x_next = x
+        except (np.linalg.LinAlgError, FloatingPointError): # pragma: no cover
+            pass
+    if bounds is not None:
+        lb, ub = bounds
+        x_next = np.clip(x_next, lb, ub)
+    x_next = x_next.reshape(shape) if shape else x_next[0]
+    return g, x_next
 
 def GPacceleration(
         f, x, xtol=5e-8, args=(), maxiter=50, memory=10, checkiter=True,
-        checkconvergence=True, bounds=None, convergenceiter=0, subset=0, *, rtol=0
+        checkconvergence=True, bounds=None, convergenceiter=0, subset=0, *, rtol=0,
+        stalltol=0.
     ):
-    """Iterative fixed-point solver with GP acceleration."""
-    x0 = x1 = x
-    errors = np.zeros(convergenceiter)
+    """
+    Iterative fixed-point solver with Gaussian process (GP) acceleration.
+    Each iteration fits a GP surrogate to the last `memory` evaluations and 
+    proposes its fixed point (within `bounds`, a tuple of lower and upper 
+    bounds) as the next iterate. This trades some linear algebra for fewer 
+    evaluations of expensive functions.
+    
+    """
+    x0 = x1 = g = x
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
     f = CachedFunction(f)
     fixedpoint_converged = utils.fixedpoint_converged
     for iter in range(maxiter):
-        x1 = GPiteration(f, x0, args, memory, bounds)
-        e = np.abs(x1 - x0)
-        if fixedpoint_converged(x0, e, xtol, rtol, subset): return x1
+        try: g, x1 = GPiteration(f, x0, args, memory, bounds)
+        except: # pragma: no cover
+            x0 = g
+            g, x1 = GPiteration(f, x0, args, memory, bounds)
+        e = np.abs(g - x0)
+        if fixedpoint_converged(x0, e, xtol, rtol, subset): return g
         if convergenceiter:
-            mean = utils.mean(e)
-            if iter > convergenceiter and mean > errors.mean():
-                if checkconvergence: utils.raise_convergence_error()
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
                 else: return x1
-            errors = np.roll(errors, shift=1)
-            errors[-1] = mean
         x0 = x1
     if checkiter: utils.raise_iter_error()
     return x1
 
 @register_jitable(cache=True)
 def fixed_point(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
-                checkconvergence=True, convergenceiter=0, subset=0, *, rtol=0):
+                checkconvergence=True, convergenceiter=0, subset=0, *, rtol=0, stalltol=0.):
     """Iterative fixed-point solver."""
     x0 = x1 = x
-    errors = np.zeros(convergenceiter)
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
     fixedpoint_converged = utils.fixedpoint_converged
     for iter in range(maxiter):
         x1 = f(x0, *args)
         e = np.abs(x1 - x0)
         if fixedpoint_converged(x0, e, xtol, rtol, subset): return x1
         if convergenceiter:
-            mean = utils.mean(e)
-            if iter > convergenceiter and mean > errors.mean():
-                if checkconvergence: utils.raise_convergence_error()
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
                 else: return x1
-            errors = np.roll(errors, shift=1)
-            errors[-1] = mean
         x0 = x1
     if checkiter: utils.raise_iter_error()
     return x1
@@ -95,9 +168,19 @@ def conditional_fixed_point(f, x):
 @register_jitable(cache=True)
 def wegstein(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
              checkconvergence=True, convergenceiter=0, subset=0, *, 
-             lb=-float('inf'), ub=float('inf'), rtol=0, exp=1.0):
-    """Iterative Wegstein solver."""
-    errors = np.zeros(convergenceiter)
+             lb=-float('inf'), ub=float('inf'), rtol=0, exp=1.0, out=None,
+             stalltol=0.):
+    """
+    Iterative Wegstein solver. If an `out` array is given, all work buffers 
+    are allocated once and iterations are computed in place; the solution
+    is written to `out`.
+    
+    """
+    if out is not None:
+        return inplace_wegstein(f, x, out, xtol, args, maxiter, checkiter,
+                                checkconvergence, convergenceiter, subset,
+                                lb, ub, rtol, exp, stalltol)
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
     x0 = x
     x1 = g0 = f(x0, *args)
     wegstein_iter = utils.wegstein_iter
@@ -114,12 +197,10 @@ def wegstein(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
         x1 = wegstein_iter(x1, dx, g1, g0, lb, ub, exp)
         g0 = g1
         if convergenceiter:
-            mean = utils.mean(e)
-            if iter > convergenceiter and mean > errors.mean():
-                if checkconvergence: utils.raise_convergence_error()
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
                 else: return x1
-            errors = np.roll(errors, shift=1)
-            errors[-1] = mean
     if checkiter: utils.raise_iter_error()
     return x1
 
@@ -144,10 +225,19 @@ def conditional_wegstein(f, x, lb=-float('inf'), ub=float('inf'), exp=0.5):
 
 @register_jitable(cache=True)
 def aitken(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
-           checkconvergence=True, convergenceiter=0, subset=0, *, rtol=0):
-    """Iterative Aitken solver."""
+           checkconvergence=True, convergenceiter=0, subset=0, *, rtol=0, out=None, 
+           stalltol=0.):
+    """
+    Iterative Aitken solver. If an `out` array is given, all work buffers 
+    are allocated once and iterations are computed in place; the solution
+    is written to `out`.
+    
+    """
+    if out is not None:
+        return inplace_aitken(f, x, out, xtol, args, maxiter, checkiter,
+                              checkconvergence, convergenceiter, subset, rtol, stalltol)
     gg = x
-    errors = np.zeros(convergenceiter)
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
     aitken_iter = utils.aitken_iter
     fixedpoint_converged = utils.fixedpoint_converged
     for iter in range(maxiter):
@@ -163,12 +253,72 @@ def aitken(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
         if fixedpoint_converged(g, np.abs(dgg_g), xtol, rtol, subset): return gg
         x = aitken_iter(x, gg, dxg, dgg_g)
         if convergenceiter:
-            mean = utils.mean(e)
-            if iter > convergenceiter and mean > errors.mean():
-                if checkconvergence: utils.raise_convergence_error()
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
+                else: return x
+    if checkiter: utils.raise_iter_error()
+    return x
+
+@register_jitable(cache=True)
+def inplace_wegstein(f, x, out, xtol, args, maxiter, checkiter,
+                     checkconvergence, convergenceiter, subset, lb, ub, rtol, exp, stalltol):
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
+    x0 = x.astype(np.float64)
+    x1 = out
+    x1[:] = g0 = f(x0, *args)
+    w = np.empty_like(x0)
+    wegstein_step = utils.array_wegstein_step
+    for iter in range(maxiter):
+        try: g1 = f(x1, *args)
+        except: # pragma: no cover
+            x0 += g0 - x1 # Preserve dx
+            x1[:] = g0
+            g1 = f(x1, *args)
+        converged, mean = wegstein_step(x0, x1, g1, g0, w, xtol, rtol, subset, lb, ub, exp)
+        if converged: 
+            out[:] = g1
+            return out
+        x0, x1 = x1, x0
+        g0 = g1
+        if convergenceiter:
+            status = utils.monitor_convergence(monitor, mean)
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
+                else: 
+                    out[:] = x1
+                    return out
+    if checkiter: utils.raise_iter_error()
+    out[:] = x1
+    return out
+
+@register_jitable(cache=True)
+def inplace_aitken(f, x, out, xtol, args, maxiter, checkiter,
+                   checkconvergence, convergenceiter, subset, rtol, stalltol):
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
+    gg = x
+    x = out
+    x[:] = gg
+    fixedpoint_error = utils.array_fixedpoint_error
+    aitken_step = utils.array_aitken_step
+    for iter in range(maxiter):
+        try: g = f(x, *args)
+        except: # pragma: no cover
+            x[:] = gg
+            g = f(x, *args)
+        converged, mean = fixedpoint_error(x, g, xtol, rtol, subset)
+        if converged:
+            x[:] = g
+            return x
+        gg = f(g, *args)
+        if aitken_step(x, g, gg, xtol, rtol, subset):
+            x[:] = gg
+            return x
+        if convergenceiter:
+            status = utils.monitor_convergence(monitor, mean)
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
                 else: return x
-            errors = np.roll(errors, shift=1)
-            errors[-1] = mean
     if checkiter: utils.raise_iter_error()
     return x
 
@@ -188,3 +338,459 @@ def conditional_aitken(f, x):
         gg, condition = f(g)
         x = aitken_iter(x, gg, x - g, gg - g)
     return x
+
+def qr_append(Q, R, m, v):
+    # Modified Gram-Schmidt update of the QR factorization of a new column
+    norm = np.sqrt(v @ v)
+    for j in range(m):
+        R[j, m] = r = Q[:, j] @ v
+        v = v - r * Q[:, j]
+    R[m, m] = r = np.sqrt(v @ v)
+    if r <= 1e-14 * norm: return False # Linearly dependent
+    Q[:, m] = v / r
+    return True
+
+def qr_delete(Q, R, m):
+    # Remove the first column of the QR factorization using Givens rotations
+    for i in range(m - 1):
+        a = R[i, i + 1]
+        b = R[i + 1, i + 1]
+        r = np.hypot(a, b)
+        c = a / r
+        s = b / r
+        R[i, i + 1] = r
+        R[i + 1, i + 1] = 0.
+        Ri = R[i, i + 2:m].copy()
+        R[i, i + 2:m] = c * Ri + s * R[i + 1, i + 2:m]
+        R[i + 1, i + 2:m] = c * R[i + 1, i + 2:m] - s * Ri
+        Qi = Q[:, i].copy()
+        Q[:, i] = c * Qi + s * Q[:, i + 1]
+        Q[:, i + 1] = c * Q[:, i + 1] - s * Qi
+    R[:m - 1, :m - 1] = R[:m - 1, 1:m]
+    R[:, m - 1] = 0.
+    R[m - 1, :] = 0.
+
+def anderson(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
+             checkconvergence=True, convergenceiter=0, subset=0, *,
+             rtol=0, memory=5, damping=1., restart=False, variant='II', droptol=1e10,
+             stalltol=0.):
+    """
+    Iterative Anderson solver. The least squares problem of type-II Anderson
+    acceleration is solved with a QR factorization of the residual differences
+    which is updated as differences are added and removed (memory is limited 
+    to the last `memory` differences). The oldest differences are also
+    dropped while the condition number of R exceeds `droptol`. Type-I 
+    acceleration is also available (`variant='I'`). If `restart` is True, 
+    the history is cleared once the memory is full instead of dropping the
+    oldest difference.
+    
+    """
+    if variant == 'II':
+        typeI = False
+    elif variant == 'I':
+        typeI = True
+    else:
+        raise ValueError(f"variant must be either 'I' or 'II', not {variant!r}")
+    shape = np.shape(x)
+    isarray = bool(shape)
+    def g(x):
+        return np.array(f(x.reshape(shape) if isarray else x[0], *args), dtype=float).ravel()
+    x0 = np.array(x, dtype=float).ravel()
+    size = x0.size
+    DX = np.zeros((size, memory))
+    if typeI:
+        DF = np.zeros((size, memory))
+    else:
+        Q = np.zeros((size, memory))
+        R = np.zeros((memory, memory))
+    m = 0
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
+    fixedpoint_converged = utils.fixedpoint_converged
+    g0 = g(x0)
+    r0 = g0 - x0
+    x1 = x0 + damping * r0
+    for iter in range(maxiter):
+        try: g1 = g(x1)
+        except: # pragma: no cover
+            x1 = g0
+            g1 = g(x1)
+            m = 0
+        r1 = g1 - x1
+        e = np.abs(r1)
+        if fixedpoint_converged(x1, e, xtol, rtol, subset): 
+            return g1.reshape(shape) if isarray else g1[0]
+        if m == memory:
+            if restart:
+                m = 0
+            elif typeI:
+                DX[:, :-1] = DX[:, 1:]
+                DF[:, :-1] = DF[:, 1:]
+                m -= 1
+            else:
+                qr_delete(Q, R, m)
+                DX[:, :-1] = DX[:, 1:]
+                m -= 1
+        dx = x1 - x0
+        dr = r1 - r0
+        if typeI:
+            DX[:, m] = dx
+            DF[:, m] = dr
+            m += 1
+        else:
+            # Drop oldest differences while ill-conditioned
+            appended = qr_append(Q, R, m, dr)
+            while not appended and m:
+                qr_delete(Q, R, m)
+                DX[:, :-1] = DX[:, 1:]
+                m -= 1
+                appended = qr_append(Q, R, m, dr)
+            if appended:
+                DX[:, m] = dx
+                m += 1
+                diagonal = np.abs(R.diagonal()[:m])
+                while m > 1 and diagonal.max() > droptol * diagonal.min():
+                    qr_delete(Q, R, m)
+                    DX[:, :-1] = DX[:, 1:]
+                    m -= 1
+                    diagonal = np.abs(R.diagonal()[:m])
+        x0 = x1
+        r0 = r1
+        g0 = g1
+        if m:
+            if typeI:
+                dX = DX[:, :m]
+                dF = DF[:, :m]
+                try: gamma = np.linalg.solve(dX.T @ dF, dX.T @ r1)
+                except np.linalg.LinAlgError: # pragma: no cover
+                    gamma = np.linalg.lstsq(dX.T @ dF, dX.T @ r1, rcond=None)[0]
+                dFgamma = dF @ gamma
+            else:
+                Qm = Q[:, :m]
+                Rm = R[:m, :m]
+                gamma = np.linalg.solve(Rm, Qm.T @ r1)
+                dFgamma = Qm @ (Rm @ gamma)
+            x1 = x1 - DX[:, :m] @ gamma + damping * (r1 - dFgamma)
+        else:
+            x1 = x1 + damping * r1
+        if convergenceiter:
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
+                else: return x1.reshape(shape) if isarray else x1[0]
+    if checkiter: utils.raise_iter_error()
+    return x1.reshape(shape) if isarray else x1[0]
+
+def broyden(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
+            checkconvergence=True, convergenceiter=0, subset=0, *,
+            rtol=0, memory=10, method='good', line_search=False, stalltol=0.):
+    """
+    Iterative Broyden solver. The inverse Jacobian of f(x) - x is 
+    approximated by -I plus at most `memory` rank-1 updates, which are 
+    stored as vector pairs instead of a dense matrix (the updates are 
+    cleared once the memory is full). Both "good" and "bad" 
+    Broyden updates are available (`method='good'` or `'bad'`). If 
+    `line_search` is True, steps are globalized with an inexact line search 
+    on the norm of f(x) - x.
+    
+    """
+    if method == 'good':
+        good = True
+    elif method == 'bad':
+        good = False
+    else:
+        raise ValueError(f"method must be either 'good' or 'bad', not {method!r}")
+    shape = np.shape(x)
+    isarray = bool(shape)
+    evaluations = {}
+    def g(x):
+        key = x.tobytes()
+        if key in evaluations: return evaluations[key]
+        gx = np.array(f(x.reshape(shape) if isarray else x[0], *args), dtype=float).ravel()
+        if line_search: evaluations[key] = gx
+        return gx
+    def merit(x):
+        r = g(x) - x
+        return np.sqrt(r @ r)
+    x0 = np.array(x, dtype=float).ravel()
+    size = x0.size
+    U = np.zeros((memory, size))
+    W = np.zeros((memory, size))
+    m = 0
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
+    fixedpoint_converged = utils.fixedpoint_converged
+    g0 = g(x0)
+    r0 = g0 - x0
+    for iter in range(maxiter):
+        e = np.abs(r0)
+        if fixedpoint_converged(x0, e, xtol, rtol, subset): 
+            return g0.reshape(shape) if isarray else g0[0]
+        # Step: dx = -H @ r0, where H = -I + U.T @ W
+        dx = r0 - U[:m].T @ (W[:m] @ r0)
+        if line_search:
+            evaluations.clear()
+            evaluations[x0.tobytes()] = g0
+            x1 = inexact_line_search(merit, x0, dx, fx=np.sqrt(r0 @ r0)).x
+            g1 = g(x1)
+        else:
+            x1 = x0 + dx
+            try: g1 = g(x1)
+            except: # pragma: no cover
+                x1 = g0
+                g1 = g(x1)
+                m = 0
+        r1 = g1 - x1
+        s = x1 - x0
+        y = r1 - r0
+        if m == memory: m = 0 # Restart
+        Hy = -y + U[:m].T @ (W[:m] @ y)
+        if good:
+            HTs = -s + W[:m].T @ (U[:m] @ s)
+            denominator = HTs @ y
+            w = HTs
+        else:
+            denominator = y @ y
+            w = y
+        if abs(denominator) > 1e-32:
+            U[m] = (s - Hy) / denominator
+            W[m] = w
+            m += 1
+        x0 = x1
+        g0 = g1
+        r0 = r1
+        if convergenceiter:
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
+                else: return x1.reshape(shape) if isarray else x1[0]
+    if checkiter: utils.raise_iter_error()
+    return x0.reshape(shape) if isarray else x0[0]
+
+def gmres(matvec, b, tol, maxiter):
+    # Solve A @ x = b from x = 0 until the relative residual is below tol 
+    # (or after maxiter Arnoldi iterations); return x and the relative residual
+    beta = np.sqrt(b @ b)
+    if beta == 0.: return np.zeros_like(b), 0.
+    V = np.zeros((maxiter + 1, b.size))
+    H = np.zeros((maxiter + 1, maxiter))
+    cs = np.zeros(maxiter)
+    sn = np.zeros(maxiter)
+    s = np.zeros(maxiter + 1)
+    s[0] = beta
+    V[0] = b / beta
+    k = 0
+    for j in range(maxiter):
+        w = matvec(V[j])
+        for i in range(j + 1): # Modified Gram-Schmidt
+            H[i, j] = h = V[i] @ w
+            w = w - h * V[i]
+        H[j + 1, j] = hnext = np.sqrt(w @ w)
+        for i in range(j): # Apply previous Givens rotations
+            Hij = H[i, j]
+            H[i, j] = cs[i] * Hij + sn[i] * H[i + 1, j]
+            H[i + 1, j] = cs[i] * H[i + 1, j] - sn[i] * Hij
+        denominator = np.hypot(H[j, j], hnext)
+        if denominator == 0.: break
+        cs[j] = H[j, j] / denominator
+        sn[j] = hnext / denominator
+        H[j, j] = denominator
+        H[j + 1, j] = 0.
+        s[j + 1] = -sn[j] * s[j]
+        s[j] *= cs[j]
+        k = j + 1
+        if abs(s[k]) <= tol * beta or hnext <= 1e-14 * beta: break
+        V[k] = w / hnext
+    if not k: return np.zeros_like(b), 1.
+    y = np.linalg.solve(H[:k, :k], s[:k])
+    return V[:k].T @ y, abs(s[k]) / beta
+
+def newton_krylov(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=True,
+                  checkconvergence=True, convergenceiter=0, subset=0, *,
+                  rtol=0, memory=20, fixedpoint=True, line_search=False, 
+                  eta_max=0.9, stalltol=0.):
+    """
+    Jacobian-free Newton-Krylov solver of x = f(x) (or f(x) = 0 if 
+    `fixedpoint` is False). Each Newton step is solved inexactly with at 
+    most `memory` GMRES iterations using finite-difference Jacobian-vector 
+    products (one evaluation each), to a relative tolerance given by 
+    Eisenstat-Walker forcing terms (at most `eta_max`). If `line_search` 
+    is 'exact', 'inexact' (or True), or 'backtracking' (Armijo), steps 
+    which do not reduce the norm of the residual are globalized with a 
+    line search.
+    
+    """
+    if line_search is True: line_search = 'inexact'
+    if line_search not in (False, None, 'exact', 'inexact', 'backtracking'):
+        raise ValueError(f"line_search must be either 'exact', 'inexact', 'backtracking', or False, not {line_search!r}")
+    shape = np.shape(x)
+    isarray = bool(shape)
+    evaluations = {}
+    def evaluate(x):
+        key = x.tobytes()
+        if key in evaluations: return evaluations[key]
+        gx = np.array(f(x.reshape(shape) if isarray else x[0], *args), dtype=float).ravel()
+        evaluations[key] = result = (gx, gx - x if fixedpoint else gx)
+        return result
+    def residual(x):
+        gx = np.array(f(x.reshape(shape) if isarray else x[0], *args), dtype=float).ravel()
+        return gx - x if fixedpoint else gx
+    def merit(x):
+        try: r = evaluate(x)[1]
+        except: return np.inf
+        return np.sqrt(r @ r)
+    def jacobian_product(v):
+        # v is normalized by GMRES
+        try:
+            return (residual(x0 + h * v) - r0) / h
+        except: # Backward difference if forward step is infeasible
+            return (r0 - residual(x0 - h * v)) / h
+    x0 = np.array(x, dtype=float).ravel()
+    monitor = utils.convergence_monitor(convergenceiter, stalltol)
+    fixedpoint_converged = utils.fixedpoint_converged
+    sqrt_eps = np.sqrt(np.finfo(float).eps)
+    g0, r0 = evaluate(x0)
+    norm0 = np.sqrt(r0 @ r0)
+    eta = eta_max
+    for iter in range(maxiter):
+        e = np.abs(r0)
+        if fixedpoint_converged(x0, e, xtol, rtol, subset):
+            x0 = g0 if fixedpoint else x0
+            return x0.reshape(shape) if isarray else x0[0]
+        h = sqrt_eps * (1. + np.sqrt(x0 @ x0))
+        dx, relative_residual = gmres(jacobian_product, -r0, eta, memory)
+        evaluations.clear()
+        evaluations[x0.tobytes()] = (g0, r0)
+        x1 = x0 + dx
+        norm1 = merit(x1)
+        if line_search and not norm1 < (1. - 1e-4) * norm0:
+            if line_search == 'exact':
+                x1 = exact_line_search(merit, x0, dx, t1=1.).x
+            elif line_search == 'backtracking':
+                # Directional derivative of the residual norm is at most -(1 - eta) * norm
+                slope = -max(1. - relative_residual, 1e-4) * norm0
+                x1 = backtracking_line_search(merit, x0, dx, fx=norm0, slope=slope).x
+            else:
+                x1 = inexact_line_search(merit, x0, dx, fx=norm0).x
+        try: g1, r1 = evaluate(x1)
+        except: # pragma: no cover
+            if not fixedpoint: raise
+            x1 = g0
+            g1, r1 = evaluate(x1)
+        norm1 = np.sqrt(r1 @ r1)
+        # Eisenstat-Walker forcing term (choice 2) with safeguards
+        eta_previous = eta
+        eta = 0.9 * (norm1 / norm0) ** 2
+        safeguard = 0.9 * eta_previous ** 2
+        if safeguard > 0.1: eta = max(eta, safeguard)
+        eta = min(eta, eta_max)
+        x0 = x1
+        g0 = g1
+        r0 = r1
+        norm0 = norm1
+        if convergenceiter:
+            status = utils.monitor_convergence(monitor, utils.mean(e))
+            if status:
+                if checkconvergence: utils.raise_monitor_error(status)
+                else: return x1.reshape(shape) if isarray else x1[0]
+    if checkiter: utils.raise_iter_error()
+    return x0.reshape(shape) if isarray else x0[0]
+
+# %% Batch solvers
+
+def batch_wegstein(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=False, 
+                   subset=0, *, lb=-float('inf'), ub=float('inf'), rtol=0, exp=1.0):
+    """
+    Iterative Wegstein solver for a batch of independent systems. Each row 
+    of `x` is the state of a system. The function is called as 
+    `f(x, index, *args)`, where `x` holds the rows that have not converged 
+    and `index` holds their position in the batch; it must return an array 
+    of the same shape. Return the solution, the number of iterations, and
+    the status code (`utils.CONVERGED` or `utils.MAXITER_EXCEEDED`) of 
+    each row.
+    
+    """
+    x0 = np.array(x, dtype=float)
+    size = x0.shape[0]
+    index = np.arange(size)
+    solution = np.empty_like(x0)
+    iterations = np.zeros(size, int)
+    status = np.full(size, utils.MAXITER_EXCEEDED)
+    x1 = g0 = f(x0, index, *args)
+    batch_wegstein_iter = utils.batch_wegstein_iter
+    batch_fixedpoint_converged = utils.batch_fixedpoint_converged
+    for iter in range(maxiter):
+        dx = x1 - x0
+        g1 = f(x1, index, *args)
+        iterations[index] += 1
+        e = np.abs(g1 - x1)
+        converged = batch_fixedpoint_converged(x1, e, xtol, rtol, subset)
+        if converged.any():
+            solution[index[converged]] = g1[converged]
+            status[index[converged]] = utils.CONVERGED
+            active = ~converged
+            index = index[active]
+            if not index.size: break
+            x1 = x1[active]
+            dx = dx[active]
+            g1 = g1[active]
+            g0 = g0[active]
+        x0 = x1
+        x1 = batch_wegstein_iter(x1, dx, g1, g0, lb, ub, exp)
+        g0 = g1
+    else:
+        solution[index] = x1
+        if checkiter and index.size: utils.raise_iter_error()
+    return solution, iterations, status
+
+def batch_aitken(f, x, xtol=5e-8, args=(), maxiter=50, checkiter=False, 
+                 subset=0, *, rtol=0):
+    """
+    Iterative Aitken solver for a batch of independent systems. Each row 
+    of `x` is the state of a system. The function is called as 
+    `f(x, index, *args)`, where `x` holds the rows that have not converged 
+    and `index` holds their position in the batch; it must return an array 
+    of the same shape. Return the solution, the number of iterations, and
+    the status code (`utils.CONVERGED` or `utils.MAXITER_EXCEEDED`) of 
+    each row.
+    
+    """
+    x = np.array(x, dtype=float)
+    size = x.shape[0]
+    index = np.arange(size)
+    solution = np.empty_like(x)
+    iterations = np.zeros(size, int)
+    status = np.full(size, utils.MAXITER_EXCEEDED)
+    batch_aitken_iter = utils.batch_aitken_iter
+    batch_fixedpoint_converged = utils.batch_fixedpoint_converged
+    for iter in range(maxiter):
+        g = f(x, index, *args)
+        iterations[index] += 1
+        dxg = x - g
+        converged = batch_fixedpoint_converged(x, np.abs(dxg), xtol, rtol, subset)
+        if converged.any():
+            solution[index[converged]] = g[converged]
+            status[index[converged]] = utils.CONVERGED
+            active = ~converged
+            index = index[active]
+            if not index.size: break
+            x = x[active]
+            g = g[active]
+            dxg = dxg[active]
+        gg = f(g, index, *args)
+        dgg_g = gg - g
+        converged = batch_fixedpoint_converged(g, np.abs(dgg_g), xtol, rtol, subset)
+        if converged.any():
+            solution[index[converged]] = gg[converged]
+            status[index[converged]] = utils.CONVERGED
+            active = ~converged
+            index = index[active]
+            if not index.size: break
+            x = x[active]
+            g = g[active]
+            gg = gg[active]
+            dxg = dxg[active]
+            dgg_g = dgg_g[active]
+        x = batch_aitken_iter(x, gg, dxg, dgg_g)
+    else:
+        solution[index] = x
+        if checkiter and index.size: utils.raise_iter_error()
+    return solution, iterations, status
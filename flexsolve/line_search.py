@@ -5,11 +5,14 @@ Line search utilities for simultaneous correction methods.
 """
 import numpy as np
 from typing import NamedTuple
-from scipy.optimize import fminbound
+from numba.extending import register_jitable
+from .minimizers import brent_minimize
 
 __all__ = (
     'exact_line_search',
     'inexact_line_search', 
+    'backtracking_line_search',
+    'vectorized_line_search',
     'LineSearchResult'
 )
 
@@ -18,18 +21,21 @@ class LineSearchResult(NamedTuple):
     t: float #: step length
     x: np.ndarray # data point
     r: float # residual
+    evaluations: int #: number of function evaluations
 
 
+# Not cached because objective functions may be jitable functions which 
+# cannot be serialized
+@register_jitable
+def objective_along(t, f, x, correction):
+    return f(x + t * correction)
+
+@register_jitable
 def exact_line_search(f, x, correction, t0=1e-9, t1=2, ttol=1e-6, maxiter=20):
-    t, f, *_ = fminbound(
-        lambda t: f(x + t * correction),
-        x1=t0,
-        x2=t1,
-        xtol=ttol,
-        maxfun=maxiter,
-        full_output=True,
+    t, ft, evaluations = brent_minimize(
+        objective_along, t0, t1, ttol, (f, x, correction), maxiter,
     )
-    return LineSearchResult(t, x + t * correction, f)
+    return LineSearchResult(t, x + t * correction, ft, evaluations)
     
 def inexact_line_search(
         f, x, correction, t0=1e-6, t1=1.1, ttol=1e-3, maxiter=10,
@@ -37,38 +43,232 @@ def inexact_line_search(
     ):
     # Find t such that f(x + t * correction) - fx < 0
     if tguess is None or not t0 < tguess < t1: tguess = 0.5 * (t1 + t0)
-    if fx is None: fx = f(x)
+    if fx is None: 
+        fx = f(x)
+        evaluations = 1
+    else:
+        evaluations = 0
     x0 = x + t0 * correction
     ft0 = f(x0)
     x1 = x + t1 * correction
     ft1 = f(x1)
+    xguess = x + tguess * correction
+    ftguess = f(xguess)
+    evaluations += 3
     if ft1 > fx:
-        xguess = x + tguess * correction
-        ftguess = f(xguess)
         if ftguess < fx: # Done!
-            best = LineSearchResult(tguess, xguess, ftguess)
+            best = LineSearchResult(tguess, xguess, ftguess, evaluations)
         elif ft1 > ft0: # Move towards x0.
-            best = LineSearchResult(t0, x0, ft0)
+            best = LineSearchResult(t0, x0, ft0, evaluations)
             for i in range(maxiter):
                 t = rho * tguess + (1 - rho) * t0
                 xt = x + t * correction
                 ft = f(xt)
-                if ft < best.f: best = LineSearchResult(t, xt, ft)
+                evaluations += 1
+                if ft < best.r: best = LineSearchResult(t, xt, ft, evaluations)
                 if abs(t - tguess) < ttol: break
                 tguess = t
+            best = best._replace(evaluations=evaluations)
         elif ftguess < ft1: # No where to go; moving forward is risky
-            best = LineSearchResult(tguess, xguess, ftguess)
+            best = LineSearchResult(tguess, xguess, ftguess, evaluations)
         else: # Hope for the best
-            best = LineSearchResult(t1, x1, ft1)
+            best = LineSearchResult(t1, x1, ft1, evaluations)
     else:
-        xguess = x + tguess * correction
-        ftguess = f(xguess)
         if ftguess < ft1: # Stick with guess
-            best = LineSearchResult(tguess, xguess, ftguess)
+            best = LineSearchResult(tguess, xguess, ftguess, evaluations)
         else: # Accelerate
-            best = LineSearchResult(t1, x1, ft1)
+            best = LineSearchResult(t1, x1, ft1, evaluations)
     return best
-        
-        
-        
-            
\ No newline at end of file
+
+def backtracking_line_search(
+        f, x, correction, fx=None, slope=None, df=None, t1=1., 
+        condition='armijo', c1=1e-4, c2=0.9, tmin=1e-10, maxiter=20,
+    ):
+    """
+    Find a step length, t, that satisfies the Armijo (sufficient decrease)
+    or strong Wolfe conditions for f(x + t * correction). The full step, 
+    `t1`, is tried first and step lengths are backtracked by 
+    quadratic/cubic interpolation of previously evaluated points.
+    
+    Parameters
+    ----------
+    f : callable
+        Merit function to minimize.
+    x : array
+        Current point.
+    correction : array
+        Search direction.
+    fx : float, optional
+        Merit at `x` (reused if given).
+    slope : float, optional
+        Directional derivative of f at `x` along `correction` (must be 
+        negative). For Newton corrections of a residual norm, it is 
+        -(1 - eta) * fx, where eta is the relative residual of the linear
+        solve. Defaults to `df(x) @ correction` or a forward-difference estimate.
+    df : callable, optional
+        Gradient of f. If not given, derivatives required for the 
+        strong Wolfe conditions are estimated by forward differences 
+        (one evaluation each).
+    condition : str, optional
+        Either 'armijo' or 'wolfe' (strong Wolfe).
+    c1, c2 : float, optional
+        Sufficient decrease and curvature parameters.
+    
+    Returns
+    -------
+    LineSearchResult
+        The accepted step (or the best step found if none was accepted) 
+        and the number of evaluations of `f`.
+    
+    """
+    if condition not in ('armijo', 'wolfe'):
+        raise ValueError(f"condition must be either 'armijo' or 'wolfe', not {condition!r}")
+    evaluations = 0
+    points = {} # Step lengths and evaluated points and merits
+    def evaluate(t):
+        nonlocal evaluations
+        evaluations += 1
+        xt = x + t * correction
+        try: ft = f(xt)
+        except: ft = np.inf
+        return xt, ft
+    def phi(t):
+        if t not in points: points[t] = evaluate(t)
+        return points[t][1]
+    epsilon = np.sqrt(np.finfo(float).eps) * max(t1, 1.)
+    def dphi(t):
+        if df is None:
+            return (evaluate(t + epsilon)[1] - phi(t)) / epsilon
+        else:
+            return df(x + t * correction) @ correction
+    if fx is None: fx = phi(0.)
+    points[0.] = (x, fx)
+    if slope is None: slope = dphi(0.)
+    if not slope < 0.: raise ValueError('correction must be a descent direction')
+    isfinite = np.isfinite
+    def sufficient_decrease(t, ft):
+        return isfinite(ft) and ft <= fx + c1 * t * slope
+    def result(t):
+        xt, ft = points[t]
+        return LineSearchResult(t, xt, ft, evaluations)
+    def best():
+        return result(min([i for i in points if i], key=lambda t: points[t][1], default=0.))
+    if condition == 'armijo':
+        t = t1
+        ft = phi(t)
+        t_last = ft_last = None
+        for iter in range(maxiter):
+            if sufficient_decrease(t, ft): return result(t)
+            if not isfinite(ft):
+                t_new = 0.5 * t
+                t_last = None
+            elif t_last is None: # Quadratic interpolation
+                t_new = -slope * t * t / (2. * (ft - fx - slope * t))
+            else: # Cubic interpolation
+                r = ft - fx - slope * t
+                r_last = ft_last - fx - slope * t_last
+                a = (r / t**2 - r_last / t_last**2) / (t - t_last)
+                b = (-t_last * r / t**2 + t * r_last / t_last**2) / (t - t_last)
+                if a == 0.:
+                    t_new = -slope / (2. * b)
+                else:
+                    t_new = (-b + np.sqrt(max(b * b - 3. * a * slope, 0.))) / (3. * a)
+            if not 0.1 * t <= t_new <= 0.5 * t: # Safeguard (also against nan)
+                t_new = min(max(t_new, 0.1 * t), 0.5 * t) if isfinite(t_new) else 0.5 * t
+            if isfinite(ft): t_last, ft_last = t, ft
+            t = t_new
+            if t < tmin: break
+            ft = phi(t)
+        return best()
+    # Strong Wolfe conditions
+    def zoom(lo, ft_lo, dft_lo, hi, ft_hi):
+        for iter in range(maxiter):
+            dt = hi - lo
+            if abs(dt) < tmin: break
+            if isfinite(ft_hi): # Quadratic interpolation
+                denominator = 2. * (ft_hi - ft_lo - dft_lo * dt)
+                t = lo - dft_lo * dt * dt / denominator if denominator else lo + 0.5 * dt
+            else:
+                t = lo + 0.5 * dt
+            a, b = sorted([lo + 0.1 * dt, hi - 0.1 * dt])
+            if not a <= t <= b: t = lo + 0.5 * dt
+            ft = phi(t)
+            if not sufficient_decrease(t, ft) or ft >= ft_lo:
+                hi, ft_hi = t, ft
+            else:
+                dft = dphi(t)
+                if abs(dft) <= -c2 * slope: return result(t)
+                if dft * dt >= 0.: hi, ft_hi = lo, ft_lo
+                lo, ft_lo, dft_lo = t, ft, dft
+        return result(lo) if lo else best()
+    t_last, ft_last, dft_last = 0., fx, slope
+    t = t1
+    for iter in range(maxiter):
+        ft = phi(t)
+        if not sufficient_decrease(t, ft) or (iter and ft >= ft_last):
+            return zoom(t_last, ft_last, dft_last, t, ft)
+        dft = dphi(t)
+        if abs(dft) <= -c2 * slope: return result(t)
+        if dft >= 0.: return zoom(t, ft, dft, t_last, ft_last)
+        t_last, ft_last, dft_last = t, ft, dft
+        t *= 2.
+    return best()
+
+def vectorized_line_search(
+        f, x, correction, t0=1e-6, t1=1.1, ttol=1e-3, maxiter=10, 
+        points=8, method='grid',
+    ):
+    """
+    Minimize f(x + t * correction) with respect to the step length, t, 
+    where f is vectorized; it takes a 2d array of trial points (one per 
+    row) and returns an array of merits. If `method` is 'grid', each call 
+    evaluates a grid of `points` step lengths and the bracket is shrunk 
+    around the best step. If `method` is 'golden', each call evaluates 
+    both interior points of a golden section bracket.
+    
+    Returns
+    -------
+    LineSearchResult
+        The best step and the total number of trial points evaluated.
+    
+    """
+    if method == 'grid':
+        if points < 3: raise ValueError('at least 3 points are required for grid search')
+    elif method != 'golden':
+        raise ValueError(f"method must be either 'grid' or 'golden', not {method!r}")
+    x = np.asarray(x, dtype=float)
+    correction = np.asarray(correction, dtype=float)
+    def phi(ts):
+        merits = np.asarray(f(x + ts[:, None] * correction), dtype=float)
+        return np.where(np.isnan(merits), np.inf, merits)
+    evaluations = 0
+    t_best = t0
+    ft_best = np.inf
+    a = t0
+    b = t1
+    if method == 'grid':
+        for iter in range(maxiter):
+            ts = np.linspace(a, b, points)
+            fts = phi(ts)
+            evaluations += points
+            i = fts.argmin()
+            if fts[i] < ft_best: t_best, ft_best = ts[i], fts[i]
+            a = ts[max(i - 1, 0)]
+            b = ts[min(i + 1, points - 1)]
+            if b - a < ttol: break
+    else:
+        golden_ratio = 0.5 * (np.sqrt(5.) - 1.)
+        for iter in range(maxiter):
+            dt = golden_ratio * (b - a)
+            ts = np.array([b - dt, a + dt])
+            fts = phi(ts)
+            evaluations += 2
+            if fts[0] <= fts[1]:
+                b = ts[1]
+                i = 0
+            else:
+                a = ts[0]
+                i = 1
+            if fts[i] < ft_best: t_best, ft_best = ts[i], fts[i]
+            if b - a < ttol: break
+    return LineSearchResult(t_best, x + t_best * correction, ft_best, evaluations)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded scalar minimizers which can be called from numba compiled code.
+
+"""
+from numba.extending import register_jitable
+from math import sqrt
+
+__all__ = ('brent_minimize',)
+
+golden_mean = 0.5 * (3.0 - sqrt(5.0))
+sqrt_eps = sqrt(2.2e-16)
+
+# Not cached because objective functions may be jitable functions which 
+# cannot be serialized
+@register_jitable
+def brent_minimize(f, x0, x1, xtol=1e-5, args=(), maxiter=500):
+    """
+    Minimize a scalar function, `f`, within `x0` and `x1` using Brent's
+    method (golden section search with parabolic interpolation). Return
+    the minimizer, the minimum, and the number of function evaluations.
+
+    Examples
+    --------
+    >>> from flexsolve import brent_minimize
+    >>> brent_minimize(lambda x: (x - 1.) ** 2 + 3., -2., 5.)
+    (1.0..., 3.0, ...)
+
+    """
+    a = x0
+    b = x1
+    fulc = nfc = xf = a + golden_mean * (b - a)
+    rat = e = 0.
+    fx = f(xf, *args)
+    evaluations = 1
+    ffulc = fnfc = fx
+    xm = 0.5 * (a + b)
+    tol1 = sqrt_eps * abs(xf) + xtol / 3.0
+    tol2 = 2.0 * tol1
+    while abs(xf - xm) > (tol2 - 0.5 * (b - a)) and evaluations < maxiter:
+        golden = True
+        if abs(e) > tol1: # Try parabolic step
+            r = (xf - nfc) * (fx - ffulc)
+            q = (xf - fulc) * (fx - fnfc)
+            p = (xf - fulc) * q - (xf - nfc) * r
+            q = 2.0 * (q - r)
+            if q > 0.0: p = -p
+            q = abs(q)
+            r = e
+            e = rat
+            if abs(p) < abs(0.5 * q * r) and q * (a - xf) < p < q * (b - xf):
+                golden = False
+                rat = p / q
+                x = xf + rat
+                if (x - a) < tol2 or (b - x) < tol2:
+                    rat = tol1 if xm >= xf else -tol1
+        if golden: # Golden section step
+            e = (a - xf) if xf >= xm else (b - xf)
+            rat = golden_mean * e
+        if rat >= 0.:
+            x = xf + max(rat, tol1)
+        else:
+            x = xf - max(-rat, tol1)
+        fu = f(x, *args)
+        evaluations += 1
+        if fu <= fx:
+            if x >= xf:
+                a = xf
+            else:
+                b = xf
+            fulc, ffulc = nfc, fnfc
+            nfc, fnfc = xf, fx
+            xf, fx = x, fu
+        else:
+            if x < xf:
+                a = x
+            else:
+                b = x
+            if fu <= fnfc or nfc == xf:
+                fulc, ffulc = nfc, fnfc
+                nfc, fnfc = x, fu
+            elif fu <= ffulc or fulc == xf or fulc == nfc:
+                fulc, ffulc = x, fu
+        xm = 0.5 * (a + b)
+        tol1 = sqrt_eps * abs(xf) + xtol / 3.0
+        tol2 = 2.0 * tol1
+    return xf, fx, evaluations
@@ -5,29 +5,69 @@ Created on Sun Jul 13 16:48:47 2025
 @author: yoelr
 """
 import numpy as np
-from scipy.differentiate import jacobian
 from numpy.linalg import cond as matrix_condition_number
-from scipy.linalg import block_diag
 
 __all__ = (
     'function_condition_number',
     'independent_functions_condition_number',
     'matrix_condition_number',
+    'block_diagonal_norm',
+    'estimate_norm',
+    'jacobian_sparsity',
+    'color_columns',
+    'SparseJacobian',
 )
 
 def norm(x):
     return np.linalg.norm(x, ord=2) if np.ndim(x) else x
 
-def independent_functions_condition_number(*fxs, **jac_kwargs):
+def estimate_norm(A, maxiter=50, rtol=1e-6):
+    """
+    Estimate the 2-norm (largest singular value) of a matrix by power 
+    iteration on A.T @ A, which only requires matrix-vector products.
+    
+    """
+    A = np.atleast_2d(A)
+    v = np.random.default_rng(0).random(A.shape[1])
+    v /= np.sqrt(v @ v)
+    sigma = 0.
+    for iter in range(maxiter):
+        u = A.T @ (A @ v)
+        norm_u = np.sqrt(u @ u)
+        if norm_u == 0.: return 0.
+        sigma_last = sigma
+        sigma = np.sqrt(norm_u)
+        v = u / norm_u
+        if abs(sigma - sigma_last) <= rtol * sigma: break
+    return sigma
+
+def block_diagonal_norm(blocks, power_iterations=0):
+    """
+    Return the 2-norm of a block diagonal matrix (the largest norm of its
+    blocks) without building the full matrix. If `power_iterations` is
+    given, the norm of each block is estimated by at most that number of
+    power iterations instead of a singular value decomposition.
+    
+    """
+    if power_iterations:
+        return max([estimate_norm(J, power_iterations) for J in blocks])
+    else:
+        return max([norm(np.atleast_2d(J)) for J in blocks])
+
+def independent_functions_condition_number(*fxs, power_iterations=0, **jac_kwargs):
     """
     Estimate the condition number of a set of nonlinear functions at a 
-    given point using finite-difference Jacobian from SciPy.
+    given point using finite-difference Jacobian from SciPy. The Jacobian of
+    the set is block diagonal, so its norm is computed block by block.
 
     Parameters
     ----------
     fxs : callable
         Pairs of functios and points at which to evaluate the condition number.
         The function is from ℝⁿ to ℝᵐ and must accept a 1D NumPy array.         
+    power_iterations : int, optional
+        If given, the norm of each Jacobian block is estimated by at most
+        this number of power iterations (useful for large blocks).
     **jac_kwargs : dict, optional
         Additional keyword arguments passed to `scipy.differentiate.jacobian`,
         such as `initial_step`, `order`, `step_direction`, etc.
@@ -47,6 +87,7 @@ def independent_functions_condition_number(*fxs, **jac_kwargs):
     where J(x) is the Jacobian of `f` at `x`, and all norms are 2-norms 
     (by default).
     """
+    from scipy.differentiate import jacobian
     xs = []
     fs = []
     Js = []
@@ -63,14 +104,13 @@ def independent_functions_condition_number(*fxs, **jac_kwargs):
         J = res.df
         add(xs, x)
         add(fs, fx)
-        add(Js, J)
+        Js.append(J)
         
-    J = block_diag(*Js)
     x = np.array(xs)
     fx = np.array(fs)
     norm_x = norm(x)
     norm_fx = norm(fx)
-    norm_J = norm(J)
+    norm_J = block_diagonal_norm(Js, power_iterations)
     if norm_fx == 0:
         kappa = np.inf
     else:
@@ -108,6 +148,7 @@ def function_condition_number(f, x, **jac_kwargs):
     where J(x) is the Jacobian of `f` at `x`, and all norms are 2-norms 
     (by default).
     """
+    from scipy.differentiate import jacobian
     x = np.asarray(x, dtype=float)
     # Compute numerical Jacobian using SciPy's differentiate API
     res = jacobian(f, x, **jac_kwargs)
@@ -123,6 +164,136 @@ def function_condition_number(f, x, **jac_kwargs):
     return kappa
 
 
+# %% Sparse Jacobian
+
+def finite_difference_steps(x):
+    return np.sqrt(np.finfo(float).eps) * np.maximum(np.abs(x), 1.)
+
+def jacobian_sparsity(f, x, fx=None):
+    """
+    Return the sparsity pattern of the Jacobian of `f` at `x` as a sparse 
+    boolean matrix. Each variable is perturbed once (n evaluations); 
+    entries that do not change are assumed to be structural zeros.
+    
+    """
+    from scipy.sparse import csc_array
+    x = np.asarray(x, dtype=float)
+    if fx is None: fx = f(x)
+    fx = np.asarray(fx, dtype=float)
+    h = finite_difference_steps(x)
+    rows = []
+    cols = []
+    for j in range(x.size):
+        xj = x.copy()
+        xj[j] += h[j]
+        i, = np.nonzero(np.asarray(f(xj), dtype=float) != fx)
+        rows.append(i)
+        cols.append(np.full(i.size, j))
+    rows = np.concatenate(rows) if rows else np.zeros(0, int)
+    cols = np.concatenate(cols) if cols else np.zeros(0, int)
+    return csc_array((np.ones(rows.size, bool), (rows, cols)), shape=(fx.size, x.size))
+
+def color_columns(sparsity):
+    """
+    Return a coloring of the columns of a sparsity pattern such that 
+    columns of the same color do not share nonzero rows. Columns are 
+    greedily colored in order of decreasing number of nonzeros.
+    
+    """
+    from scipy.sparse import csc_array
+    sparsity = csc_array(sparsity, dtype=bool)
+    sparsity.sum_duplicates()
+    csr = sparsity.tocsr()
+    indptr = sparsity.indptr
+    indices = sparsity.indices
+    n = sparsity.shape[1]
+    colors = np.full(n, -1)
+    order = np.argsort(-np.diff(indptr), kind='stable')
+    for j in order:
+        rows = indices[indptr[j]:indptr[j + 1]]
+        neighbors = np.concatenate([csr.indices[csr.indptr[i]:csr.indptr[i + 1]] for i in rows]) if rows.size else rows
+        used = set(colors[neighbors].tolist())
+        color = 0
+        while color in used: color += 1
+        colors[j] = color
+    return colors
+
+class SparseJacobian:
+    """
+    Create a finite-difference Jacobian estimator which exploits sparsity.
+    The sparsity pattern is detected once (unless given) and columns are 
+    colored so that each Jacobian only requires one evaluation per color.
+    
+    Parameters
+    ----------
+    f : callable
+        A function from ℝⁿ to ℝᵐ which accepts a 1D NumPy array.
+    x : array_like, optional
+        Point at which to detect the sparsity pattern.
+    sparsity : array_like or sparse matrix, optional
+        Sparsity pattern of the Jacobian.
+    
+    Examples
+    --------
+    >>> import flexsolve as flx
+    >>> import numpy as np
+    >>> def f(x):
+    ...     y = x ** 2
+    ...     y[1:] += x[:-1]
+    ...     return y
+    >>> jacobian = flx.SparseJacobian(f, np.ones(100))
+    >>> jacobian.ncolors
+    2
+    >>> J = jacobian(np.ones(100))
+    >>> float(J[1, 0]), float(J[1, 1])
+    (1.0..., 2.0...)
+    
+    """
+    __slots__ = ('f', 'sparsity', 'colors', 'ncolors', 'rows', 'cols', 'groups')
+    
+    def __init__(self, f, x=None, sparsity=None):
+        from scipy.sparse import csc_array
+        self.f = f
+        if sparsity is None:
+            if x is None: raise ValueError('either x or sparsity must be given')
+            sparsity = jacobian_sparsity(f, x)
+        else:
+            sparsity = csc_array(sparsity, dtype=bool)
+            sparsity.eliminate_zeros()
+        self.sparsity = sparsity
+        self.colors = colors = color_columns(sparsity)
+        self.ncolors = ncolors = int(colors.max()) + 1 if colors.size else 0
+        coo = sparsity.tocoo()
+        self.rows = rows = coo.row
+        self.cols = cols = coo.col
+        # Nonzeros and columns of each color
+        entry_colors = colors[cols]
+        self.groups = [(np.flatnonzero(entry_colors == c), np.flatnonzero(colors == c))
+                       for c in range(ncolors)]
+    
+    def __call__(self, x, fx=None):
+        """Return the Jacobian at `x` as a sparse matrix."""
+        from scipy.sparse import csr_array
+        x = np.asarray(x, dtype=float)
+        if fx is None: fx = self.f(x)
+        fx = np.asarray(fx, dtype=float)
+        h = finite_difference_steps(x)
+        rows = self.rows
+        cols = self.cols
+        data = np.zeros(rows.size)
+        for entries, columns in self.groups:
+            xc = x.copy()
+            xc[columns] += h[columns]
+            df = np.asarray(self.f(xc), dtype=float) - fx
+            data[entries] = df[rows[entries]] / h[cols[entries]]
+        return csr_array((data, (rows, cols)), shape=self.sparsity.shape)
+    
+    def __repr__(self):
+        m, n = self.sparsity.shape
+        name = getattr(self.f, '__name__', repr(self.f))
+        return f"{type(self).__name__}(f={name}, shape=({m}, {n}), ncolors={self.ncolors})"
+
+
 if __name__ == '__main__':
     
     def f0(x0):
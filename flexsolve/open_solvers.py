@@ -8,7 +8,7 @@ from numba.extending import register_jitable
 from flexsolve.bounded_solvers import IQ_interpolation
 from flexsolve import utils
 
-__all__ = ('secant', 'aitken_secant')
+__all__ = ('secant', 'aitken_secant', 'newton', 'halley')
 
 @register_jitable(cache=True)
 def secant(f, x0, x1=None, xtol=0., ytol=5e-8, args=(), maxiter=50,
@@ -122,3 +122,121 @@ def aitken_secant(f, x0, x1=None, xtol=0., ytol=5e-8, args=(), maxiter=50,
         y0 = y1
     if checkiter: utils.raise_iter_error()
     return x1
+
+@register_jitable(cache=True)
+def newton(f, x0, xtol=0., ytol=5e-8, args=(), maxiter=50,
+           checkroot=False, checkiter=True):
+    """
+    Newton solver; `f` must return the value and derivative of the objective 
+    function. Once a sign change is found, iterations are kept within
+    the bracket (using false position steps whenever the Newton step leaves
+    the bracket).
+    
+    """
+    if checkroot: utils.check_tols(xtol, ytol)
+    abs_ = abs
+    y0, dy0 = f(x0, *args)
+    if not checkroot and abs_(y0) < ytol or y0 == 0: return x0
+    bracketed = False
+    a = b = ya = yb = 0.
+    not_within_bounds = utils.not_within_bounds
+    for iter in range(maxiter):
+        if dy0 == 0.: 
+            if bracketed:
+                x1 = utils.bisect(a, b)
+            elif checkroot or checkiter: 
+                utils.raise_tol_error()
+            else: 
+                return x0
+        else:
+            x1 = x0 - y0 / dy0
+            if bracketed and not_within_bounds(x1, a, b):
+                x1 = utils.false_position_iter(a, b, b - a, ya, yb, -ya, x0)
+        dx = x1 - x0
+        y1, dy1 = f(x1, *args)
+        xtol_satisfied = abs_(dx) < xtol
+        ytol_satisfied = abs_(y1) < ytol
+        if checkroot:
+            if ytol_satisfied and xtol_satisfied: return x1
+        elif ytol_satisfied or xtol_satisfied: 
+            return x1
+        if y1 == 0.: return x1
+        if bracketed:
+            if (y1 > 0.) == (ya > 0.):
+                a = x1
+                ya = y1
+            else:
+                b = x1
+                yb = y1
+        elif y1 * y0 < 0.:
+            bracketed = True
+            a = x0
+            ya = y0
+            b = x1
+            yb = y1
+        x0 = x1
+        y0 = y1
+        dy0 = dy1
+    if checkiter: utils.raise_iter_error()
+    return x0
+
+@register_jitable(cache=True)
+def halley(f, x0, xtol=0., ytol=5e-8, args=(), maxiter=50,
+           checkroot=False, checkiter=True):
+    """
+    Halley solver; `f` must return the value, first derivative, and second
+    derivative of the objective function. Once a sign change is found, 
+    iterations are kept within the bracket (using false position steps 
+    whenever the Halley step leaves the bracket).
+    
+    """
+    if checkroot: utils.check_tols(xtol, ytol)
+    abs_ = abs
+    y0, dy0, d2y0 = f(x0, *args)
+    if not checkroot and abs_(y0) < ytol or y0 == 0: return x0
+    bracketed = False
+    a = b = ya = yb = 0.
+    not_within_bounds = utils.not_within_bounds
+    for iter in range(maxiter):
+        denominator = 2. * dy0 * dy0 - y0 * d2y0
+        if denominator == 0. or dy0 == 0.: 
+            if bracketed:
+                x1 = utils.bisect(a, b)
+            elif dy0 != 0.:
+                x1 = x0 - y0 / dy0
+            elif checkroot or checkiter: 
+                utils.raise_tol_error()
+            else: 
+                return x0
+        else:
+            x1 = x0 - 2. * y0 * dy0 / denominator
+            if bracketed and not_within_bounds(x1, a, b):
+                x1 = utils.false_position_iter(a, b, b - a, ya, yb, -ya, x0)
+        dx = x1 - x0
+        y1, dy1, d2y1 = f(x1, *args)
+        xtol_satisfied = abs_(dx) < xtol
+        ytol_satisfied = abs_(y1) < ytol
+        if checkroot:
+            if ytol_satisfied and xtol_satisfied: return x1
+        elif ytol_satisfied or xtol_satisfied: 
+            return x1
+        if y1 == 0.: return x1
+        if bracketed:
+            if (y1 > 0.) == (ya > 0.):
+                a = x1
+                ya = y1
+            else:
+                b = x1
+                yb = y1
+        elif y1 * y0 < 0.:
+            bracketed = True
+            a = x0
+            ya = y0
+            b = x1
+            yb = y1
+        x0 = x1
+        y0 = y1
+        dy0 = dy1
+        d2y0 = d2y1
+    if checkiter: utils.raise_iter_error()
+    return x0
@@ -28,10 +28,10 @@ class Problem: # pragma: no cover
     def f_fixedpoint(self, x, *args):
         return self.f(x, *args) + x
     
-    def profile_solver(self, solver, ytol, kwargs={}):
+    def profile_solver(self, solver, ytol, kwargs={}, timing=False):
         isfixedpoint = solver in fixedpoint_solvers
         f = self.f_fixedpoint if isfixedpoint else self.f
-        p = Profiler(f)
+        p = Profiler(f, timing=timing)
         for case in self.cases:
             if isfixedpoint: case = f(case) - case
             try:
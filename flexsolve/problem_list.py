@@ -9,6 +9,10 @@ import numpy as np
 
 __all__ = ('ProblemList',)
 
+timing_percentiles = (50, 99)
+timing_fields = ['Time in f', 'Time between calls', 
+                 *[f'Latency p{i}' for i in timing_percentiles]]
+
 pd = None
 def _load_pandas(): # pragma: no cover
     global pd
@@ -30,25 +34,32 @@ class ProblemList(list): # pragma: no cover
         self.append(problem)
         return problem
     
-    def profiles_list(self, solver, tol, kwargs):
-        return [i.profile_solver(solver, tol, kwargs) for i in self]
+    def profiles_list(self, solver, tol, kwargs, timing=False):
+        return [i.profile_solver(solver, tol, kwargs, timing) for i in self]
     
-    def profiles_dict(self, solver, tol, kwargs):
-        return {i.name: i.profile_solver(solver, tol, kwargs) for i in self}
+    def profiles_dict(self, solver, tol, kwargs, timing=False):
+        return {i.name: i.profile_solver(solver, tol, kwargs, timing) for i in self}
         
-    def results_array(self, solvers, tol, solver_kwargs=None):
-        solver_problem_profiles = [self.profiles_list(i, tol, j) for i,j in zip(solvers, solver_kwargs)]
-        get_column = lambda x: sum([(i.size(), len(i.passed_cases), len(i.failed_cases)) for i in x], ())
+    def results_array(self, solvers, tol, solver_kwargs=None, timing=False):
+        solver_problem_profiles = [self.profiles_list(i, tol, j, timing) for i,j in zip(solvers, solver_kwargs)]
+        if timing:
+            # Timing covers both passed and failed cases
+            get_column = lambda x: sum([(i.size(), len(i.passed_cases), len(i.failed_cases), 
+                                         *i.timing_stats(timing_percentiles, i.passed_cases + i.failed_cases).values())
+                                        for i in x], ())
+        else:
+            get_column = lambda x: sum([(i.size(), len(i.passed_cases), len(i.failed_cases)) for i in x], ())
         data = [get_column(i) for i in solver_problem_profiles]
         return np.array(data).transpose()
         
-    def results_df(self, solvers, tol, solver_kwargs=None, solver_names=None):
+    def results_df(self, solvers, tol, solver_kwargs=None, solver_names=None, timing=False):
         _load_pandas()
         problem_names = [i.name for i in self]
         problem_fields = ['Iterations', 'Passed', 'Failed']
+        if timing: problem_fields += [i + ' [s]' for i in timing_fields]
         multi_index = pd.MultiIndex.from_product([problem_names, problem_fields], names=['Problem', 'Summary'])
         columns = solver_names
-        data = self.results_array(solvers, tol, solver_kwargs)
+        data = self.results_array(solvers, tol, solver_kwargs, timing)
         return pd.DataFrame(data, columns=columns, index=multi_index)
     
     def summary_array(self, solvers, tol, solver_kwargs=None):
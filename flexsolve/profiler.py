@@ -5,9 +5,16 @@ Created on Wed Nov 20 23:09:53 2019
 @author: yoelr
 """
 import numpy as np
+import os
+from time import time, perf_counter
 from copy import copy
+from typing import NamedTuple
+from numba import njit
+from numba.extending import register_jitable
 
-__all__ = ('Profiler',)
+__all__ = ('Profiler', 'JitProfiler', 'Recorder', 'record_evaluation',
+           'StreamStorage', 'load_archives', 'ConvergenceAnalysis',
+           'convergence_analysis')
      
 plt = None
 
@@ -17,16 +24,483 @@ def _load_matplotlib(): # pragma: no cover
         import matplotlib.pyplot as plt       
     
             
+# %% Storage of evaluations
+
+class Storage:
+    __slots__ = ()
+    
+    def to_archive(self, name, kind='active'):
+        archive = Archive(name, *self.data())
+        self.clear()
+        return archive
+    
+
+class ListStorage(Storage):
+    """Store a copy of every input and output in lists."""
+    __slots__ = ('xs', 'ys')
+    
+    def __init__(self):
+        self.xs = []
+        self.ys = []
+    
+    @property
+    def evaluations(self):
+        return len(self.xs)
+    
+    def record(self, f, x, args):
+        x = copy(x)
+        self.xs.append(x)
+        y = f(x, *args)
+        self.ys.append(y[0] if isinstance(y, tuple) else y)
+        return y
+    
+    def data(self):
+        return np.array(self.xs), np.array(self.ys), len(self.xs)
+    
+    def clear(self):
+        self.xs = []
+        self.ys = []
+        
+
+class ArrayStorage(Storage):
+    """
+    Store inputs and outputs in preallocated NumPy buffers which grow 
+    geometrically. If `maxlen` is given, buffers are not grown; only the 
+    last `maxlen` evaluations are kept (ring buffer).
+    
+    """
+    __slots__ = ('maxlen', 'capacity', 'evaluations', 'x_buffer', 'y_buffer')
+    
+    def __init__(self, maxlen=None, capacity=64):
+        self.maxlen = maxlen
+        self.capacity = capacity if maxlen is None else maxlen
+        self.clear()
+    
+    def reduce_x(self, x):
+        return x
+    
+    def reduce_y(self, x, y):
+        return y
+    
+    def record(self, f, x, args):
+        # Inputs are stored (and counted) before evaluating, as in ListStorage
+        xr = self.reduce_x(x)
+        x_buffer = self.x_buffer
+        if x_buffer is None:
+            self.x_buffer = x_buffer = np.empty((self.capacity, *np.shape(xr)), np.result_type(xr, float))
+        index = self.evaluations
+        if self.maxlen is None:
+            if index == self.capacity: 
+                self.capacity *= 2
+                x_buffer = self.x_buffer = self.grow(x_buffer)
+                if self.y_buffer is not None: self.y_buffer = self.grow(self.y_buffer)
+        else:
+            index %= self.capacity
+        self.evaluations += 1
+        x_buffer[index] = xr
+        y_buffer = self.y_buffer
+        if y_buffer is not None: y_buffer[index] = np.nan
+        y = f(x, *args)
+        yr = self.reduce_y(x, y[0] if isinstance(y, tuple) else y)
+        if y_buffer is None:
+            self.y_buffer = y_buffer = np.full((self.capacity, *np.shape(yr)), np.nan, np.result_type(yr, float))
+        y_buffer[index] = yr
+        return y
+    
+    def grow(self, buffer):
+        new = np.empty((self.capacity, *buffer.shape[1:]), buffer.dtype)
+        new[:len(buffer)] = buffer
+        return new
+    
+    def data(self):
+        evaluations = self.evaluations
+        x_buffer = self.x_buffer
+        if x_buffer is None: return np.zeros(0), np.zeros(0), evaluations
+        y_buffer = self.y_buffer
+        if y_buffer is None: y_buffer = np.full(len(x_buffer), np.nan) # All evaluations failed
+        return (*ordered_buffers(x_buffer, y_buffer, evaluations), evaluations)
+    
+    @property
+    def xs(self):
+        return self.data()[0]
+    
+    @property
+    def ys(self):
+        return self.data()[1]
+    
+    def clear(self):
+        self.evaluations = 0
+        self.x_buffer = self.y_buffer = None
+
+
+class ReductionStorage(ArrayStorage):
+    """
+    Only store the norms of inputs and outputs, and the norm of the 
+    residual, y - x, (or of the output if shapes do not match) of each 
+    evaluation. Reductions are stored as columns of `ys`.
+    
+    """
+    __slots__ = ()
+    
+    def reduce_x(self, x):
+        return np.linalg.norm(x)
+    
+    def reduce_y(self, x, y):
+        norm = np.linalg.norm
+        norm_y = norm(y)
+        residual = norm(np.subtract(y, x)) if np.shape(y) == np.shape(x) else norm_y
+        return norm_y, residual
+
+
+class RecorderStorage(Storage):
+    """Access evaluations stored in a Recorder object."""
+    __slots__ = ('recorder',)
+    
+    def __init__(self, recorder):
+        self.recorder = recorder
+    
+    @property
+    def evaluations(self):
+        return int(self.recorder.count[0])
+    
+    def data(self):
+        xs, ys, count = self.recorder
+        evaluations = int(count[0])
+        return (*ordered_buffers(xs, ys, evaluations), evaluations)
+    
+    @property
+    def xs(self):
+        return self.data()[0]
+    
+    @property
+    def ys(self):
+        return self.data()[1]
+    
+    def clear(self):
+        self.recorder.count[0] = 0
+
+
+class StreamStorage(Storage):
+    """
+    Stream evaluations (inputs, outputs, and timestamps) to disk as they 
+    are produced. Evaluations are buffered in chunks of `chunksize` and 
+    each chunk is saved as a .npz file in the `path` directory. Archived 
+    names and cases are kept in an index file, so the directory is 
+    append-only and may be reused across sessions. Use `load_archives` 
+    to lazily load archives.
+    
+    Examples
+    --------
+    >>> import flexsolve as flx
+    >>> import numpy as np
+    >>> from tempfile import TemporaryDirectory
+    >>> with TemporaryDirectory() as path:
+    ...     p = flx.Profiler(lambda x: 0.5 * x + 1, flx.StreamStorage(path, chunksize=2))
+    ...     x = flx.wegstein(p, np.zeros(10))
+    ...     p.archive('Wegstein')
+    ...     archives = flx.load_archives(path)
+    ...     print(archives, archives[0].xs.shape)
+    [LazyArchive(name='Wegstein', evaluations=3)] (3, 10)
+    
+    """
+    __slots__ = ('path', 'chunksize', 'buffer', 'times', 'chunks', 
+                 'evaluations', 'index')
+    
+    def __init__(self, path, chunksize=4096):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunksize = chunksize
+        self.buffer = ArrayStorage(maxlen=chunksize)
+        self.times = np.empty(chunksize)
+        self.chunks = 0
+        self.evaluations = 0
+        self.index = load_index(path)
+    
+    def chunk_file(self, chunk):
+        return chunk_file(self.path, len(self.index['names']), chunk)
+    
+    def record(self, f, x, args):
+        buffer = self.buffer
+        if buffer.evaluations == self.chunksize: self.flush()
+        self.evaluations += 1
+        try:
+            return buffer.record(f, x, args)
+        finally:
+            self.times[buffer.evaluations - 1] = time()
+    
+    def flush(self):
+        buffer = self.buffer
+        if not buffer.evaluations: return
+        xs, ys, evaluations = buffer.data()
+        np.savez(self.chunk_file(self.chunks), x=xs, y=ys, time=self.times[:evaluations])
+        self.chunks += 1
+        buffer.clear()
+    
+    def data(self):
+        xs = []
+        ys = []
+        for chunk in range(self.chunks):
+            with np.load(self.chunk_file(chunk)) as data:
+                xs.append(data['x'])
+                ys.append(data['y'])
+        if self.buffer.evaluations:
+            x, y, evaluations = self.buffer.data()
+            xs.append(x)
+            ys.append(y)
+        if xs:
+            return np.concatenate(xs), np.concatenate(ys), self.evaluations
+        else:
+            return np.zeros(0), np.zeros(0), self.evaluations
+    
+    @property
+    def xs(self):
+        return self.data()[0]
+    
+    @property
+    def ys(self):
+        return self.data()[1]
+    
+    def to_archive(self, name, kind='active'):
+        self.flush()
+        index = self.index
+        key = len(index['names'])
+        index['names'].append(name)
+        index['kinds'].append(kind)
+        index['evaluations'].append(self.evaluations)
+        index['chunks'].append(self.chunks)
+        np.savez(os.path.join(self.path, 'index.npz'), 
+                 **{i: np.array(j) for i, j in index.items()})
+        archive = LazyArchive(self.path, key, name, kind, self.evaluations, self.chunks)
+        self.chunks = self.evaluations = 0
+        return archive
+    
+    def clear(self):
+        for chunk in range(self.chunks): os.remove(self.chunk_file(chunk))
+        self.chunks = self.evaluations = 0
+        self.buffer.clear()
+
+
+def chunk_file(path, key, chunk):
+    return os.path.join(path, f'archive{key:06d}_chunk{chunk:06d}.npz')
+
+def load_index(path):
+    file = os.path.join(path, 'index.npz')
+    if os.path.exists(file):
+        with np.load(file) as data:
+            return {i: data[i].tolist() for i in ('names', 'kinds', 'evaluations', 'chunks')}
+    else:
+        return {'names': [], 'kinds': [], 'evaluations': [], 'chunks': []}
+
+def load_archives(path, kind=None):
+    """
+    Return archives streamed to the `path` directory (by a StreamStorage 
+    object). Archived data is only loaded when accessed. If `kind` is 
+    given, only return 'active', 'passed', or 'failed' archives.
+    
+    """
+    index = load_index(path)
+    return [LazyArchive(path, key, *args) for key, args in 
+            enumerate(zip(index['names'], index['kinds'], index['evaluations'], index['chunks']))
+            if kind is None or args[1] == kind]
+
+def ordered_buffers(x_buffer, y_buffer, evaluations):
+    # Return copies of the last evaluations stored in ring buffers, in order
+    capacity = len(x_buffer)
+    if evaluations <= capacity:
+        return x_buffer[:evaluations].copy(), y_buffer[:evaluations].copy()
+    else:
+        index = evaluations % capacity
+        return np.roll(x_buffer, -index, axis=0), np.roll(y_buffer, -index, axis=0)
+
+
+storages = {
+    'list': ListStorage,
+    'array': ArrayStorage,
+    'ring': ArrayStorage,
+    'reductions': ReductionStorage,
+}
+
+def create_storage(storage, maxlen):
+    if isinstance(storage, str):
+        if storage not in storages:
+            raise ValueError(f"storage must be one of {list(storages)}, not {storage!r}")
+        if storage == 'ring':
+            if maxlen is None: raise ValueError("maxlen is required for 'ring' storage")
+            return ArrayStorage(maxlen)
+        elif storage == 'list':
+            if maxlen is not None: raise ValueError("maxlen is not valid for 'list' storage")
+            return ListStorage()
+        else:
+            return storages[storage](maxlen)
+    else:
+        return storage
+
+# %% Timing evaluations
+
+class Timer:
+    """Record the start and stop times of each call to a function."""
+    __slots__ = ('f', 'starts', 'stops')
+    
+    def __init__(self, f):
+        self.f = f
+        self.starts = []
+        self.stops = []
+        
+    def __call__(self, x, *args):
+        self.starts.append(perf_counter())
+        try:
+            return self.f(x, *args)
+        finally:
+            self.stops.append(perf_counter())
+    
+    def pop(self):
+        timings = np.array([self.starts, self.stops]).reshape([2, -1]).transpose()
+        self.starts = []
+        self.stops = []
+        return timings
+    
+
+def timing_stats(timings, percentiles=(50, 90, 99)):
+    """
+    Return a dictionary of the total time spent in function calls, the 
+    total time spent between calls (i.e. solver overhead), and percentiles 
+    of call latencies (in seconds) given a list of arrays of start and stop 
+    times (one array per run).
+    
+    """
+    latencies = [i[:, 1] - i[:, 0] for i in timings]
+    latencies = np.concatenate(latencies) if latencies else np.zeros(0)
+    stats = {
+        'Time in f': latencies.sum(),
+        'Time between calls': sum([(i[1:, 0] - i[:-1, 1]).sum() for i in timings]),
+    }
+    for q in percentiles:
+        stats[f'Latency p{q:g}'] = np.percentile(latencies, q) if latencies.size else np.nan
+    return stats
+
+
+# %% Convergence analysis
+
+class ConvergenceAnalysis(NamedTuple):
+    order: float #: Estimated order of convergence
+    contraction: float #: Asymptotic ratio of consecutive errors
+    preasymptotic: int #: Iterations before errors decrease monotonically
+    evaluations: float #: Evaluations to reach tolerance (nan if not reached)
+
+
+def convergence_analysis(errors, tol=None, offset=0):
+    """
+    Return a ConvergenceAnalysis object given the errors of consecutive 
+    iterations. The asymptotic phase is the last run of monotonically 
+    decreasing errors up to the smallest error. The order of convergence, 
+    q, is estimated from the last three errors of the asymptotic phase as 
+    log(e[k+1] / e[k]) / log(e[k] / e[k-1]) and the contraction factor is 
+    the last ratio of errors, e[k+1] / e[k]. The number of evaluations to 
+    reach `tol` is offset by `offset` (i.e., the number of evaluations before 
+    the first error given).
+    
+    Examples
+    --------
+    >>> from flexsolve import convergence_analysis
+    >>> convergence_analysis([4, 5, 1, 0.5, 0.25, 0.125], tol=0.3)
+    ConvergenceAnalysis(order=1.0, contraction=0.5, preasymptotic=1, evaluations=5)
+    
+    """
+    errors = np.asarray(errors, dtype=float)
+    converged = errors <= tol if tol is not None else np.zeros(errors.size, bool)
+    index = converged.argmax() if converged.size else 0
+    if not converged.any() or (offset and not index):
+        evaluations = np.nan # Not reached or reached before the first error given
+    else:
+        evaluations = int(index) + 1 + offset
+    if not errors.size: return ConvergenceAnalysis(np.nan, np.nan, 0, evaluations)
+    stop = int(errors.argmin()) + 1
+    if not errors[stop - 1]: stop -= 1 # Ratios are undefined at exact solutions
+    start = stop - 1
+    while start > 0 and errors[start] < errors[start - 1]: start -= 1
+    ratios = errors[start + 1:stop] / errors[start:stop - 1]
+    contraction = float(ratios[-1]) if ratios.size else np.nan
+    if ratios.size >= 2:
+        order = float(np.log(ratios[-1]) / np.log(ratios[-2]))
+    elif ratios.size:
+        order = 1.
+    else:
+        order = np.nan
+    return ConvergenceAnalysis(order, contraction, start, evaluations)
+
+
+# %% Recording evaluations in compiled code
+
+class Recorder(NamedTuple):
+    xs: np.ndarray #: Ring buffer of inputs
+    ys: np.ndarray #: Ring buffer of outputs
+    count: np.ndarray #: Number of evaluations (single element)
+
+
+@register_jitable(cache=True)
+def record_evaluation(recorder, x, y):
+    """Record an evaluation of a function at `x` (works in nopython mode)."""
+    count = recorder.count
+    index = count[0] % len(recorder.xs)
+    recorder.xs[index] = x
+    recorder.ys[index] = y
+    count[0] += 1
+
+
+def profiled_function(f):
+    if not hasattr(f, 'py_func'): f = njit(f)
+    
+    # Not cached because the profiled function is a closure
+    @njit
+    def profiled(x, recorder, *args):
+        y = f(x, *args)
+        record_evaluation(recorder, x, y)
+        return y
+    
+    return profiled
+
+
+# %% Profiling
+
 class Archive: # pragma: no cover
-    __slots__ = ('name', 'xs', 'ys')
+    __slots__ = ('name', 'xs', 'ys', 'evaluations', 'timings')
     
-    def __init__(self, name, xs, ys):
+    def __init__(self, name, xs, ys, evaluations=None, timings=None):
         self.name = name
         self.xs = np.array(xs)
         self.ys = np.array(ys)
+        self.evaluations = len(self.xs) if evaluations is None else evaluations
+        self.timings = timings #: Start and stop times of each evaluation
     
     def __len__(self):
-        return len(self.xs)
+        return self.evaluations
+    
+    def timing_stats(self, percentiles=(50, 90, 99)):
+        if self.timings is None: raise RuntimeError('evaluations were not timed')
+        return timing_stats([self.timings], percentiles)
+    
+    def errors(self, fixedpoint=False):
+        """
+        Return the error of each stored evaluation; the maximum absolute 
+        value of outputs (or of outputs minus inputs if `fixedpoint` is True).
+        
+        """
+        ys = self.ys
+        if fixedpoint:
+            xs = self.xs
+            n = min(len(xs), len(ys))
+            ys = ys[:n] - xs[:n]
+        return np.abs(ys.reshape([len(ys), -1])).max(1) if ys.size else np.zeros(0)
+    
+    def convergence_analysis(self, tol=None, fixedpoint=False):
+        """
+        Return a ConvergenceAnalysis object with the estimated order of 
+        convergence, asymptotic contraction factor, number of pre-asymptotic
+        iterations, and number of evaluations to reach `tol`.
+        
+        """
+        errors = self.errors(fixedpoint)
+        return convergence_analysis(errors, tol, self.evaluations - len(errors))
     
     @property
     def size(self):
@@ -59,35 +533,145 @@ class Archive: # pragma: no cover
               ")")
 
 
+class LazyArchive(Archive): # pragma: no cover
+    __slots__ = ('path', 'key', 'kind', 'chunks', 'data')
+    
+    def __init__(self, path, key, name, kind, evaluations, chunks):
+        self.path = path
+        self.key = key
+        self.name = name
+        self.kind = kind
+        self.evaluations = evaluations
+        self.chunks = chunks
+        self.data = None
+        self.timings = None
+    
+    def load(self):
+        if self.data is None:
+            chunks = []
+            for chunk in range(self.chunks):
+                with np.load(chunk_file(self.path, self.key, chunk)) as data:
+                    chunks.append((data['x'], data['y'], data['time']))
+            if chunks:
+                self.data = [np.concatenate(i) for i in zip(*chunks)]
+            else:
+                self.data = [np.zeros(0), np.zeros(0), np.zeros(0)]
+        return self.data
+    
+    @property
+    def xs(self):
+        return self.load()[0]
+    
+    @property
+    def ys(self):
+        return self.load()[1]
+    
+    @property
+    def times(self):
+        return self.load()[2]
+    
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name!r}, evaluations={self.evaluations})"
+
+    def _ipython_display_(self):
+        print(repr(self))
+    
+
 class Profiler: # pragma: no cover
-    __slots__ = ('f', 'xs', 'ys', 'active_archives', 'passed_cases', 'failed_cases')
-    def __init__(self, f):
+    """
+    Create a Profiler object that records the evaluations of a function 
+    for archiving and plotting.
+    
+    Parameters
+    ----------
+    f : callable
+        Function to profile.
+    storage : str, optional
+        How evaluations are stored:
+        
+        * 'list': A copy of every input and output (default).
+        * 'array': Inputs and outputs in growable NumPy buffers.
+        * 'ring': Only the last `maxlen` inputs and outputs.
+        * 'reductions': Only the norms of inputs, outputs, and residuals.
+        
+    maxlen : int, optional
+        Maximum number of evaluations stored (required by 'ring' storage).
+    timing : bool, optional
+        Whether to record the start and stop times of each evaluation.
+        
+    Examples
+    --------
+    >>> import flexsolve as flx
+    >>> import numpy as np
+    >>> p = flx.Profiler(lambda x: 0.5 * x + 1, storage='ring', maxlen=2)
+    >>> x = flx.wegstein(p, np.zeros(1000))
+    >>> p.archive('Wegstein')
+    >>> p.sizes()
+    {'Wegstein': 3}
+    >>> p.active_archives[0].xs.shape
+    (2, 1000)
+    
+    """
+    __slots__ = ('f', 'storage', 'timer', 'active_archives', 'passed_cases', 'failed_cases')
+    
+    def __init__(self, f, storage='list', maxlen=None, timing=False):
         self.f = f
+        self.storage = create_storage(storage, maxlen)
+        self.timer = Timer(f) if timing else None
         self.active_archives = self.passed_cases = []
         self.failed_cases = []
-        self.xs = []
-        self.ys = []
+    
+    @property
+    def xs(self):
+        return self.storage.xs
+    
+    @property
+    def ys(self):
+        return self.storage.ys
         
     def __call__(self, x, *args):
-        x = copy(x)
-        self.xs.append(x)
-        y = self.f(x, *args)
-        if isinstance(y, tuple): 
-            self.ys.append(y[0])
-        else:
-            self.ys.append(y)
-        return y
+        return self.storage.record(self.f if self.timer is None else self.timer, x, args)
+    
+    def to_archive(self, name, kind='active'):
+        archive = self.storage.to_archive(name, kind)
+        if self.timer is not None: archive.timings = self.timer.pop()
+        return archive
     
     def archive(self, name):
-        self.active_archives.append(Archive(name, self.xs, self.ys))
-        self.xs = []
-        self.ys = []
+        self.active_archives.append(self.to_archive(name))
 
     def archive_case(self, case, failed=False):
-        archives = self.failed_cases if failed else self.passed_cases
-        archives.append(Archive(case, self.xs, self.ys))
-        self.xs = []
-        self.ys = []
+        if failed:
+            self.failed_cases.append(self.to_archive(case, 'failed'))
+        else:
+            self.passed_cases.append(self.to_archive(case, 'passed'))
+    
+    def timing_stats(self, percentiles=(50, 90, 99), archives=None):
+        """
+        Return a dictionary of the total time spent in evaluations, the 
+        total time spent between evaluations (i.e. solver overhead), and 
+        percentiles of evaluation latencies (in seconds) of the given 
+        archives (defaults to active archives).
+        
+        """
+        if self.timer is None: raise RuntimeError('profiler is not timing evaluations')
+        if archives is None: archives = self.active_archives
+        return timing_stats([i.timings for i in archives], percentiles)
+    
+    def convergence_analysis(self, tol=None, fixedpoint=False):
+        """
+        Return a ConvergenceAnalysis object with the median estimated order 
+        of convergence, asymptotic contraction factor, number of 
+        pre-asymptotic iterations, and number of evaluations to reach `tol` 
+        across passed cases (ignoring cases where these are undefined).
+        
+        """
+        analyses = [i.convergence_analysis(tol, fixedpoint) for i in self.passed_cases]
+        if not analyses: return ConvergenceAnalysis(np.nan, np.nan, np.nan, np.nan)
+        return ConvergenceAnalysis(
+            *[float(np.nanmedian(i)) if not np.isnan(i).all() else np.nan 
+              for i in np.array(analyses, dtype=float).transpose()]
+        )
 
     def size(self):
         return sum([len(archive) for archive in self.active_archives])
@@ -184,4 +768,63 @@ class Profiler: # pragma: no cover
     
     def __repr__(self):
         return f"{type(self).__name__}({self.f})"
-    
\ No newline at end of file
+    
+
+
+class JitProfiler(Profiler): # pragma: no cover
+    """
+    Create a JitProfiler object that records evaluations of a function in 
+    nopython mode. Evaluations are stored in preallocated arrays (a 
+    Recorder object) that must be passed to the profiled function, `f`, 
+    as its first extra argument. This allows profiling within compiled 
+    solvers (e.g., when calling `secant` or `IQ_interpolation` from a numba
+    compiled function).
+    
+    Parameters
+    ----------
+    f : callable
+        Function to profile, f(x, *args). It is compiled with numba if not
+        already compiled.
+    x : float or array
+        Example input (only its shape is used).
+    y : float or array, optional
+        Example output (only its shape is used). Defaults to `x`.
+    capacity : int, optional
+        Maximum number of evaluations stored; only the last evaluations 
+        are kept if exceeded.
+    
+    Examples
+    --------
+    >>> import flexsolve as flx
+    >>> from numba import njit
+    >>> @njit
+    ... def f(x): return x ** 3 - 8
+    >>> @njit
+    ... def solve(f, recorder):
+    ...     return flx.secant(f, 1., 3., xtol=1e-12, args=(recorder,))
+    >>> p = flx.JitProfiler(f, 1., capacity=100)
+    >>> solve(p.f, p.recorder)
+    2.0
+    >>> p.archive('Secant')
+    >>> p.sizes()
+    {'Secant': 8}
+    
+    """
+    __slots__ = ('recorder',)
+    
+    def __init__(self, f, x, y=None, capacity=1000):
+        xshape = np.shape(x)
+        yshape = xshape if y is None else np.shape(y)
+        self.recorder = recorder = Recorder(
+            np.empty((capacity, *xshape)), 
+            np.empty((capacity, *yshape)),
+            np.zeros(1, dtype=np.int64),
+        )
+        self.f = profiled_function(f)
+        self.storage = RecorderStorage(recorder)
+        self.timer = None
+        self.active_archives = self.passed_cases = []
+        self.failed_cases = []
+    
+    def __call__(self, x, *args):
+        return self.f(x, self.recorder, *args)
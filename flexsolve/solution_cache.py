@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Warm-start cache of previous solutions for bounded and open solvers.
+
+"""
+import numpy as np
+from collections import OrderedDict
+from typing import NamedTuple
+
+__all__ = ('SolutionCache', 'CacheInfo')
+
+
+class CacheInfo(NamedTuple):
+    hits: int #: Number of solves warm-started from previous solutions
+    misses: int #: Number of solves without previous solutions
+    maxsize: int #: Maximum number of solutions stored per objective function
+    currsize: int #: Number of solutions stored
+
+
+class CachedSolution(NamedTuple):
+    point: np.ndarray # Numerical arguments
+    bracket: tuple # Bracket used to solve the root
+    root: float
+
+
+def numerical_point(args):
+    try:
+        return np.hstack([np.ravel(i) for i in args]).astype(float) if args else np.zeros(0)
+    except (TypeError, ValueError):
+        return None
+
+
+class SolutionCache:
+    """
+    Create a least-recently-used cache of solutions for warm-starting
+    bounded and open solvers. Solutions are recorded by objective function
+    and arguments. Subsequent solves use the nearest previous solutions to
+    interpolate an initial guess (and a tightened bracket for bounded solvers).
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of solutions stored per objective function. Defaults to 128.
+
+    Examples
+    --------
+    >>> import flexsolve as flx
+    >>> f = lambda x, a: x**3 - 40 + a*x
+    >>> cache = flx.SolutionCache(maxsize=10)
+    >>> cache.bounded_solve(flx.IQ_interpolation, f, -10, 20, args=(2.,))
+    3.22524046...
+    >>> cache.bounded_solve(flx.IQ_interpolation, f, -10, 20, args=(2.1,))
+    3.21...
+    >>> cache.cache_info()
+    CacheInfo(hits=1, misses=1, maxsize=10, currsize=2)
+
+    """
+    __slots__ = ('maxsize', 'solutions', 'hits', 'misses')
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.solutions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, f, args, bracket, root):
+        """Record the root of `f` solved with the given arguments and bracket."""
+        if f in self.solutions:
+            solutions = self.solutions[f]
+        else:
+            self.solutions[f] = solutions = OrderedDict()
+        key = self._key(args)
+        if key in solutions: solutions.move_to_end(key)
+        solutions[key] = CachedSolution(numerical_point(args), bracket, root)
+        if len(solutions) > self.maxsize: solutions.popitem(last=False)
+
+    def guess(self, f, args):
+        """
+        Return an interpolated guess of the root of `f` at the given
+        arguments and its estimated error, or None if no previous solution
+        is available.
+
+        """
+        solutions = self.solutions.get(f)
+        if not solutions: return None
+        key = self._key(args)
+        if key in solutions:
+            solutions.move_to_end(key)
+            return solutions[key].root, 0.
+        point = numerical_point(args)
+        if point is None: return None
+        neighbors = [i for i in solutions.values() if i.point is not None and i.point.shape == point.shape]
+        if not neighbors: return None
+        distances = [np.linalg.norm(i.point - point) for i in neighbors]
+        order = np.argsort(distances)
+        first = neighbors[order[0]]
+        if len(neighbors) == 1:
+            return first.root, abs(first.root) * 1e-3 + 1e-6
+        second = neighbors[order[1]]
+        # Interpolate along the line between the two nearest solutions
+        direction = second.point - first.point
+        norm = direction @ direction
+        s = 0. if norm == 0. else min(max((point - first.point) @ direction / norm, -1.), 2.)
+        root = first.root + s * (second.root - first.root)
+        error = max(abs(root - first.root), abs(root - second.root))
+        return root, error
+
+    def bounded_solve(self, solver, f, x0, x1, args=(), **kwargs):
+        """
+        Solve `f` with a bounded solver (e.g., `IQ_interpolation`) within
+        `x0` and `x1` using a warm-start guess and bracket when available.
+        Additional key-word arguments are passed to the solver.
+
+        """
+        guess = self.guess(f, args)
+        if guess is None:
+            self.misses += 1
+            root = solver(f, x0, x1, args=args, **kwargs)
+            self.record(f, args, (x0, x1), root)
+            return root
+        self.hits += 1
+        x, error = guess
+        lb, ub = (x0, x1) if x0 < x1 else (x1, x0)
+        if lb < x < ub:
+            dx = 2. * error + 1e-3 * (ub - lb)
+            lb_guess = max(x - dx, lb)
+            ub_guess = min(x + dx, ub)
+            y0 = f(lb_guess, *args)
+            y1 = f(ub_guess, *args)
+            if y0 * y1 <= 0.:
+                root = solver(f, lb_guess, ub_guess, y0, y1, x, args=args, **kwargs)
+                self.record(f, args, (lb_guess, ub_guess), root)
+                return root
+        else:
+            x = None
+        root = solver(f, x0, x1, None, None, x, args=args, **kwargs)
+        self.record(f, args, (x0, x1), root)
+        return root
+
+    def open_solve(self, solver, f, x0, x1=None, args=(), **kwargs):
+        """
+        Solve `f` with an open solver (e.g., `secant`) starting from the
+        warm-start guess when available (or `x0` otherwise). Additional
+        key-word arguments are passed to the solver.
+
+        """
+        guess = self.guess(f, args)
+        if guess is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            x0, error = guess
+            x1 = x0 + error if error else None
+        root = solver(f, x0, x1, args=args, **kwargs)
+        self.record(f, args, (x0, x1), root)
+        return root
+
+    def cache_info(self):
+        """Return hit/miss statistics."""
+        currsize = sum([len(i) for i in self.solutions.values()])
+        return CacheInfo(self.hits, self.misses, self.maxsize, currsize)
+
+    def clear(self):
+        """Clear all solutions and statistics."""
+        self.solutions.clear()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _key(args):
+        try:
+            hash(args)
+        except TypeError:
+            return tuple([np.asarray(i).tobytes() for i in args])
+        else:
+            return args
+
+    def __repr__(self):
+        return f"{type(self).__name__}(maxsize={self.maxsize})"
@@ -3,19 +3,45 @@
 Created on Mon Apr 20 16:41:04 2020
 @author: yoelr
 """
-from numba import njit, types, float64 as f64
+from numba import njit, prange, types, float64 as f64
 from numba.extending import overload
 from collections.abc import Iterable
+from typing import NamedTuple
 import numpy as np
 
 __all__ = ('pick_best_solution', 'wegstein_iter',
            'aitken_iter', 'array_wegstein_iter', 'scalar_wegstein_iter',
            'array_aitken_iter', 'scalar_aitken_iter', 'not_within_bounds',
            'iteration_is_getting_stuck', 'bisect', 'false_position_iter',
-           'IQ_iter', 'fixedpoint_converged')
+           'IQ_iter', 'fixedpoint_converged', 'array_false_position_iter',
+           'array_IQ_iter', 'batch_fixedpoint_converged', 'batch_wegstein_iter',
+           'batch_aitken_iter', 'array_fixedpoint_error', 'array_wegstein_step',
+           'array_aitken_step', 'ConvergenceMonitor', 'convergence_monitor', 
+           'monitor_convergence', 'raise_monitor_error', 
+           'parallel_array_fixedpoint_converged', 'parallel_array_wegstein_iter',
+           'parallel_array_aitken_iter', 'PARALLEL_THRESHOLD', 'CONVERGED', 
+           'MAXITER_EXCEEDED', 'INVALID_BRACKET', 'DIVERGING', 'STALLED', 
+           'OSCILLATING')
 
 np.seterr(divide='raise', invalid='raise')
 
+# Array kernels switch to multithreaded versions at this size; note that
+# the value is frozen in compiled (and cached) kernels
+PARALLEL_THRESHOLD = 2 ** 17
+
+# Number of elements checked by each thread before looking for early exits
+CHUNKSIZE = 2 ** 14
+
+# Status codes of batched solvers (one per lane)
+CONVERGED = 0
+MAXITER_EXCEEDED = 1
+INVALID_BRACKET = 2
+
+# Status codes of convergence monitors (0 while making progress)
+DIVERGING = 3
+STALLED = 4
+OSCILLATING = 5
+
 @njit(cache=True)
 def pick_best_solution(xys):
     """
@@ -50,6 +76,78 @@ def scalar_mean(x): return x
 def jit_mean(x): # pragma: no cover
     return np.mean if isinstance(x, types.Array) and x.ndim else scalar_mean
 
+# Convergence monitor
+
+class ConvergenceMonitor(NamedTuple):
+    errors: np.ndarray #: Ring buffer of the last errors
+    state: np.ndarray #: Count, running sum, last error, last sign, alternations, contraction ratio, and stall tolerance
+
+# Indices of monitor state
+COUNT = 0
+TOTAL = 1
+LAST_ERROR = 2
+LAST_SIGN = 3
+ALTERNATIONS = 4
+RATIO = 5
+STALLTOL = 6
+
+@njit(cache=True)
+def convergence_monitor(size, stalltol=0.):
+    """
+    Return a convergence monitor of the last `size` errors of an iterative
+    solver. If `stalltol` is given, iterations which reduce the error 
+    by a factor of less than `stalltol` on average over the last `size` 
+    iterations are flagged as stalled (or oscillating if the error 
+    alternates between increasing and decreasing).
+    
+    """
+    state = np.zeros(7)
+    state[STALLTOL] = stalltol
+    return ConvergenceMonitor(np.zeros(size), state)
+
+@njit(cache=True)
+def monitor_convergence(monitor, error):
+    """
+    Update the monitor with the error of the current iteration and return 
+    its status: 0 if the iteration is making progress, or `DIVERGING` 
+    (the error is above the running mean of the last errors), `STALLED`, 
+    or `OSCILLATING`.
+    
+    """
+    errors, state = monitor
+    size = errors.size
+    count = int(state[COUNT])
+    index = count % size
+    diverging = count > size and error > state[TOTAL] / size
+    if count:
+        sign = np.sign(error - state[LAST_ERROR])
+        if sign:
+            if sign * state[LAST_SIGN] < 0.:
+                state[ALTERNATIONS] += 1.
+            else:
+                state[ALTERNATIONS] = 0.
+            state[LAST_SIGN] = sign
+    status = 0
+    oldest = errors[index]
+    if count >= size and oldest > 0.:
+        # Geometric mean of the contraction ratios over the window
+        state[RATIO] = ratio = (error / oldest) ** (1. / size)
+        stalltol = state[STALLTOL]
+        if stalltol and ratio > 1. - stalltol:
+            if state[ALTERNATIONS] >= size - 1:
+                status = OSCILLATING
+            elif not diverging:
+                status = STALLED
+    if diverging and not status: status = DIVERGING
+    errors[index] = error
+    if index == size - 1:
+        state[TOTAL] = errors.sum() # Prevent round-off drift
+    else:
+        state[TOTAL] += error - oldest
+    state[LAST_ERROR] = error
+    state[COUNT] = count + 1
+    return status
+
 # Fixed point
 
 def fixedpoint_converged(x, dx, xtol, rtol, subset=0):
@@ -75,6 +173,8 @@ def array_fixedpoint_converged(x, dx, xtol, rtol, subset):
     if subset: 
         x = x[:subset]
         dx = dx[:subset]
+    if x.size >= PARALLEL_THRESHOLD: 
+        return parallel_array_fixedpoint_converged(x, dx, xtol, rtol)
     for i in range(x.size):
         xi = x.flat[i]
         dxi = dx.flat[i]
@@ -85,6 +185,59 @@ def array_fixedpoint_converged(x, dx, xtol, rtol, subset):
                 return False
     return True
 
+@njit(cache=True)
+def chunk_fixedpoint_converged(x, dx, xtol, rtol, start, end):
+    for i in range(start, end):
+        dxi = dx[i]
+        if dxi > xtol:
+            xi = x[i]
+            if xi < xtol: 
+                xi = xtol
+            if dxi / xi > rtol:
+                return False
+    return True
+
+@njit(parallel=True, cache=True)
+def parallel_array_fixedpoint_converged(x, dx, xtol, rtol):
+    x = x.ravel()
+    dx = dx.ravel()
+    size = x.size
+    nchunks = (size + CHUNKSIZE - 1) // CHUNKSIZE
+    # Shared flag for early exit; other threads skip their remaining chunks
+    # once any element has not converged (benign race, all writes are True)
+    not_converged = np.zeros(1, dtype=np.bool_)
+    for chunk in prange(nchunks):
+        if not not_converged[0]:
+            start = chunk * CHUNKSIZE
+            end = min(start + CHUNKSIZE, size)
+            if not chunk_fixedpoint_converged(x, dx, xtol, rtol, start, end):
+                not_converged[0] = True
+    return not not_converged[0]
+
+@njit(cache=True)
+def batch_fixedpoint_converged(x, dx, xtol, rtol, subset):
+    converged = np.empty(x.shape[0], dtype=np.bool_)
+    for i in range(x.shape[0]):
+        converged[i] = array_fixedpoint_converged(x[i], dx[i], xtol, rtol, subset)
+    return converged
+
+@njit(cache=True)
+def array_fixedpoint_error(x, g, xtol, rtol, subset):
+    # Fused convergence check of g = f(x) without allocating abs(g - x);
+    # return whether it converged and the mean absolute error
+    size = x.size
+    nsubset = x[:subset].size if subset else size
+    converged = True
+    total = 0.
+    for i in range(size):
+        xi = x.flat[i]
+        ei = abs(g.flat[i] - xi)
+        total += ei
+        if converged and i < nsubset and ei > xtol:
+            if xi < xtol: xi = xtol
+            if ei / xi > rtol: converged = False
+    return converged, total / size
+
 # Wegstein
 
 def wegstein_iter(x, dx, g1, g0, lb, ub, exp):
@@ -114,6 +267,8 @@ def scalar_wegstein_iter(x, dx, g1, g0, lb, ub, exp):
 
 @njit(cache=True)
 def array_wegstein_iter(x, dx, g1, g0, lb, ub, exp):
+    if x.size >= PARALLEL_THRESHOLD:
+        return parallel_array_wegstein_iter(x, dx, g1, g0, lb, ub, exp)
     denominator = dx-g1+g0
     x_new = x.copy()
     w = x.copy()
@@ -137,6 +292,93 @@ def array_wegstein_iter(x, dx, g1, g0, lb, ub, exp):
     x_new = w * g1 + (1. - w) * x
     return x_new
 
+@njit(parallel=True, cache=True)
+def parallel_array_wegstein_iter(x, dx, g1, g0, lb, ub, exp):
+    shape = x.shape
+    x = x.ravel()
+    dx = dx.ravel()
+    g1 = g1.ravel()
+    g0 = g0.ravel()
+    size = x.size
+    w = np.empty(size)
+    w_min = np.inf
+    w_max = -np.inf
+    for i in prange(size):
+        dxi = dx[i]
+        di = dxi - g1[i] + g0[i]
+        if np.abs(di) > 1e-16 and np.abs(dxi) < 1e16: 
+            wi = dxi / di
+        else:
+            wi = 1.
+        w[i] = wi
+        w_min = min(w_min, wi)
+        w_max = max(w_max, wi)
+    if w_min < lb:
+        shift = lb - w_min
+        w_max += shift
+    else:
+        shift = 0.
+    scale = ub / w_max if w_max > ub else 1.
+    skip_negative = lb < 0 and exp < 1 and w_min < 0
+    x_new = np.empty(size)
+    for i in prange(size):
+        wi = (w[i] + shift) * scale
+        if not (skip_negative and wi < 0): wi = wi ** exp
+        x_new[i] = wi * g1[i] + (1. - wi) * x[i]
+    return x_new.reshape(shape)
+
+@njit(cache=True)
+def batch_wegstein_iter(x, dx, g1, g0, lb, ub, exp):
+    x_new = np.empty_like(x)
+    for i in range(x.shape[0]):
+        x_new[i] = array_wegstein_iter(x[i], dx[i], g1[i], g0[i], lb, ub, exp)
+    return x_new
+
+@njit(cache=True)
+def array_wegstein_step(x0, x1, g1, g0, w, xtol, rtol, subset, lb, ub, exp):
+    # In-place Wegstein iteration fused with the convergence check of
+    # g1 = f(x1); the next iterate overwrites x0 and `w` is a workspace.
+    # Return whether g1 converged (x0 is left untouched) and the mean error.
+    size = x1.size
+    nsubset = x1[:subset].size if subset else size
+    converged = True
+    total = 0.
+    w_min = np.inf
+    w_max = -np.inf
+    for i in range(size):
+        x1i = x1.flat[i]
+        g1i = g1.flat[i]
+        dxi = x1i - x0.flat[i]
+        di = dxi - g1i + g0.flat[i]
+        if np.abs(di) > 1e-16 and np.abs(dxi) < 1e16: 
+            wi = dxi / di
+        else:
+            wi = 1.
+        w.flat[i] = wi
+        if wi < w_min: w_min = wi
+        if wi > w_max: w_max = wi
+        ei = abs(g1i - x1i)
+        total += ei
+        if converged and i < nsubset and ei > xtol:
+            if x1i < xtol: x1i = xtol
+            if ei / x1i > rtol: converged = False
+    error = total / size
+    if converged: return True, error
+    if w_min < lb: 
+        shift = lb - w_min
+        w_max += shift
+    else:
+        shift = 0.
+    scale = ub / w_max if w_max > ub else 1.
+    skip_negative = lb < 0 and exp < 1 and w_min < 0
+    for i in range(size):
+        wi = w.flat[i]
+        if shift: wi += shift
+        if scale != 1.: wi *= scale
+        if not (skip_negative and wi < 0): wi = wi ** exp
+        x0.flat[i] = wi * g1.flat[i] + (1. - wi) * x1.flat[i]
+    return False, error
+
 # Aitken
 
 def aitken_iter(x, gg, dxg, dgg_g):
@@ -164,6 +406,8 @@ def scalar_aitken_iter(x, gg, dxg, dgg_g):
 
 @njit(cache=True)
 def array_aitken_iter(x, gg, dxg, dgg_g):
+    if x.size >= PARALLEL_THRESHOLD:
+        return parallel_array_aitken_iter(x, gg, dxg, dgg_g)
     denominator = dgg_g + dxg
     x_new = gg.copy()
     for i in np.ndindex(x.shape):
@@ -173,6 +417,54 @@ def array_aitken_iter(x, gg, dxg, dgg_g):
             x_new[i] = x[i] - dxgi * dxgi / di
     return x_new
 
+@njit(parallel=True, cache=True)
+def parallel_array_aitken_iter(x, gg, dxg, dgg_g):
+    shape = x.shape
+    x = x.ravel()
+    gg = gg.ravel()
+    dxg = dxg.ravel()
+    dgg_g = dgg_g.ravel()
+    size = x.size
+    x_new = np.empty(size)
+    for i in prange(size):
+        dxgi = dxg[i]
+        di = dgg_g[i] + dxgi
+        if np.abs(di) > 1e-16 and np.abs(dxgi) < 1e16: 
+            x_new[i] = x[i] - dxgi * dxgi / di
+        else:
+            x_new[i] = gg[i]
+    return x_new.reshape(shape)
+
+@njit(cache=True)
+def batch_aitken_iter(x, gg, dxg, dgg_g):
+    x_new = np.empty_like(x)
+    for i in range(x.shape[0]):
+        x_new[i] = array_aitken_iter(x[i], gg[i], dxg[i], dgg_g[i])
+    return x_new
+
+@njit(cache=True)
+def array_aitken_step(x, g, gg, xtol, rtol, subset):
+    # In-place Aitken iteration fused with the convergence check of 
+    # gg = f(g); the next iterate overwrites x. Return whether gg converged.
+    size = x.size
+    nsubset = x[:subset].size if subset else size
+    converged = True
+    for i in range(size):
+        gi = g.flat[i]
+        ggi = gg.flat[i]
+        dxgi = x.flat[i] - gi
+        dgg_gi = ggi - gi
+        ei = abs(dgg_gi)
+        if converged and i < nsubset and ei > xtol:
+            if gi < xtol: gi = xtol
+            if ei / gi > rtol: converged = False
+        di = dgg_gi + dxgi
+        if np.abs(di) > 1e-16 and np.abs(dxgi) < 1e16: 
+            x.flat[i] -= dxgi * dxgi / di
+        else:
+            x.flat[i] = ggi
+    return converged
+
 # %% Bounded solvers
 
 @njit(f64(f64, f64, f64), cache=True)
@@ -217,6 +509,20 @@ def IQ_iter(y0, y1, y2, x0, x1, x2, dx, df0, xlast):
         x = false_position_iter(x0, x1, dx, y0, y1, df0, xlast)
     return x
 
+@njit(cache=True)
+def array_false_position_iter(x0, x1, dx, y0, y1, df, xlast):
+    x = np.empty_like(x0)
+    for i in range(x0.size):
+        x[i] = false_position_iter(x0[i], x1[i], dx[i], y0[i], y1[i], df[i], xlast[i])
+    return x
+
+@njit(cache=True)
+def array_IQ_iter(y0, y1, y2, x0, x1, x2, dx, df0, xlast):
+    x = np.empty_like(x0)
+    for i in range(x0.size):
+        x[i] = IQ_iter(y0[i], y1[i], y2[i], x0[i], x1[i], x2[i], dx[i], df0[i], xlast[i])
+    return x
+
 @njit(cache=True)
 def raise_iter_error(): # pragma: no cover 
     raise RuntimeError('maximum number of iterations exceeded; root could not be solved')
@@ -229,6 +535,17 @@ def raise_tol_error(): # pragma: no cover
 def raise_convergence_error(): # pragma: no cover 
     raise RuntimeError('objective function either oscillates or diverges from solution; root could not be solved')
 
+@njit(cache=True)
+def raise_stall_error(): # pragma: no cover 
+    raise RuntimeError('iteration stalled; root could not be solved')
+
+@njit(cache=True)
+def raise_monitor_error(status): # pragma: no cover 
+    if status == STALLED: 
+        raise_stall_error()
+    else:
+        raise_convergence_error()
+
 @njit(cache=True)
 def check_tols(xtol, ytol): # pragma: no cover
     if xtol <= 0. or ytol <= 0.:
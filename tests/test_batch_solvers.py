@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+"""
+from numba import njit
+import numpy as np
+import flexsolve as flx
+from numpy.testing import assert_allclose
+
+@njit(cache=True)
+def f(x, args):
+    return x**3 - 40 + args[0]*x
+
+def test_solve_batch():
+    a = np.linspace(1, 5, 20)
+    args_array = a.reshape([20, 1])
+    expected = np.array([flx.IQ_interpolation(lambda x: x**3 - 40 + i*x, -10, 20) for i in a])
+    for solver in (flx.secant, flx.aitken_secant):
+        roots, evaluations, status = flx.solve_batch(solver, f, np.zeros(20), None, args_array)
+        assert_allclose(roots, expected, rtol=1e-6)
+        assert (status == flx.utils.CONVERGED).all()
+        assert (evaluations > 0).all()
+    for solver in (flx.IQ_interpolation, flx.false_position, flx.bisection, flx.chandrupatla, flx.ITP):
+        roots, evaluations, status = flx.solve_batch(solver, f, np.full(20, -10.), np.full(20, 20.), args_array)
+        assert_allclose(roots, expected, rtol=1e-6)
+        assert (status == flx.utils.CONVERGED).all()
+    roots, evaluations, status = flx.solve_batch(flx.IQ_interpolation, f, np.full(20, 10.), np.full(20, 20.), args_array)
+    assert (status == flx.utils.INVALID_BRACKET).all()
+    roots, evaluations, status = flx.solve_batch(flx.secant, f, np.zeros(20), None, args_array, maxiter=2)
+    assert (status == flx.utils.MAXITER_EXCEEDED).all()
@@ -5,6 +5,7 @@ Created on Sun Apr 19 17:12:04 2020
 @author: yoelr
 """
 import flexsolve as flx 
+import numpy as np
 from numpy.testing import assert_allclose
 
 # %% Profile solvers
@@ -33,10 +34,70 @@ def test_bounded_solvers():
     assert_allclose(flx.IQ_interpolation(f, x0, x1), 3.225240462791775, rtol=1e-5)
     assert_allclose(flx.bisection(f, x0, x1), 3.225240461761132, rtol=1e-5)
     assert_allclose(flx.false_position(f, x0, x1), 3.2252404627266342, rtol=1e-5)
+    assert_allclose(flx.chandrupatla(f, x0, x1), 3.225240462792126, rtol=1e-5)
+    assert_allclose(flx.ITP(f, x0, x1), 3.22524046233327, rtol=1e-5)
     assert_allclose(flx.find_bracket(f, -5, 5), (-5, 5, -175, 95), rtol=1e-5)
     assert_allclose(flx.find_bracket(f, -5, 0), (-5, 10.0, -175, 980.0), rtol=1e-5)
     assert_allclose(flx.find_bracket(f, -10, -5), (-10, 5.0, -1060, 95.0), rtol=1e-5)
     assert_allclose(flx.find_bracket(f, 5, 10), (-6.073446327683616, 10, -276.1765907762578, 980), rtol=1e-5)
     assert_allclose(flx.find_bracket(f, 10, 5), (-6.073446327683616, 10, -276.1765907762578, 980), rtol=1e-5)
     
-    
\ No newline at end of file
+def test_ITP_worst_case():
+    from math import ceil, log2
+    f = lambda x: x**3 - 40 + 2*x
+    for x0, x1 in [(-10, 20), (-10, 20.5), (-3, 7.3), (0, 4)]:
+        for xtol in (1e-3, 1e-6, 1e-9, 1e-12):
+            for n0 in (0, 1, 2):
+                p = flx.Profiler(f)
+                flx.ITP(p, x0, x1, xtol=xtol, ytol=0., maxiter=200, n0=n0)
+                iterations = len(p.xs) - 2
+                assert iterations <= ceil(log2((x1 - x0) / xtol)) + n0
+    
+    # With default tolerances, interpolation steps are not lost to projections
+    for x0, x1 in [(-10, 20), (-1, 5)]:
+        p = flx.Profiler(f)
+        flx.ITP(p, x0, x1)
+        eps = 2.2e-16 * max(abs(x0), abs(x1))
+        assert len(p.xs) < 0.5 * ceil(log2((x1 - x0) / eps))
+    
+def test_batch_IQ_interpolation():
+    a = np.linspace(1, 50, 7)
+    f = lambda x, index: x**3 - 40 + a[index]*x
+    x0 = np.full(7, -10.)
+    x1 = np.full(7, 20.)
+    roots, iterations, status = flx.batch_IQ_interpolation(f, x0, x1)
+    expected = [flx.IQ_interpolation(lambda x: x**3 - 40 + ai*x, -10, 20) for ai in a]
+    assert_allclose(roots, expected, rtol=1e-5)
+    assert (status == flx.utils.CONVERGED).all()
+    assert (iterations > 0).all()
+    x0[2] = 10.
+    roots, iterations, status = flx.batch_IQ_interpolation(f, x0, x1)
+    assert status[2] == flx.utils.INVALID_BRACKET
+    assert np.isnan(roots[2])
+    
+    # Lanes which finish before iterating are not evaluated again
+    calls = []
+    def g(x, index):
+        calls.append(x.size)
+        return f(x, index) + 0 * x.max() # Fails for empty arrays
+    roots, iterations, status = flx.batch_IQ_interpolation(g, np.array(expected), x1)
+    assert calls == [7, 7]
+    assert (status == flx.utils.CONVERGED).all()
+    assert_allclose(roots, expected)
+    calls.clear()
+    roots, iterations, status = flx.batch_IQ_interpolation(g, np.full(7, 10.), x1)
+    assert calls == [7, 7]
+    assert (status == flx.utils.INVALID_BRACKET).all()
+    assert (iterations == 0).all()
+    
+def test_batch_find_bracket():
+    f = lambda x: x**3 - 40 + 2*x
+    brackets = [(-5, 5), (-5, 0), (-10, -5), (5, 10), (10, 5)]
+    x0, x1 = np.array(brackets, dtype=float).T
+    x0, x1, y0, y1 = flx.batch_find_bracket(lambda x, index: f(x), x0, x1)
+    expected = [flx.find_bracket(f, *i) for i in brackets]
+    assert_allclose(np.array([x0, x1, y0, y1]).T, expected, rtol=1e-5)
+    roots, iterations, status = flx.batch_IQ_interpolation(
+        lambda x, index: f(x), x0, x1, y0, y1
+    )
+    assert_allclose(roots, 3.225240462791775, rtol=1e-5)
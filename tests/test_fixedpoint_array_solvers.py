@@ -123,6 +123,75 @@ def test_fixedpoint_array_solvers2():
                              'Fixed point': 191, 'Fixed point early termination': 191}
     
   
+def test_anderson():
+    original_feed = feed.copy()
+    p = flx.Profiler(f)
+    solution = flx.anderson(p, feed, xtol=1e-8, maxiter=200)
+    assert_allclose(feed, original_feed)
+    assert_allclose(solution, real_solution)
+    p.archive('Anderson')
+    
+    p = flx.Profiler(f2)
+    solution = flx.anderson(p, feed, xtol=1e-8, maxiter=200)
+    assert_allclose(solution, real_solution2)
+    p.archive('Anderson')
+    
+    solution = flx.anderson(p, feed, xtol=1e-8, maxiter=200, variant='I')
+    assert_allclose(solution, real_solution2)
+    p.archive('Anderson type-I')
+    
+    solution = flx.anderson(p, feed, xtol=1e-8, maxiter=200, memory=2, damping=0.5)
+    assert_allclose(solution, real_solution2)
+    p.archive('Damped Anderson')
+    assert p.sizes() == {'Anderson': 10, 'Anderson type-I': 12, 'Damped Anderson': 9}
+    
+def test_GPacceleration():
+    original_feed = feed.copy()
+    p = flx.Profiler(f2)
+    solution = flx.GPacceleration(p, feed, xtol=1e-8, maxiter=200)
+    assert_allclose(feed, original_feed)
+    assert_allclose(solution, real_solution2)
+    p.archive('GP')
+    
+    solution = flx.GPacceleration(p, feed, xtol=1e-8, maxiter=200, memory=5, bounds=(0, np.inf))
+    assert_allclose(solution, real_solution2)
+    p.archive('GP with bounds')
+    sizes = p.sizes()
+    assert sizes['GP'] < 20 and sizes['GP with bounds'] < 20
+    
+def test_broyden():
+    original_feed = feed.copy()
+    p = flx.Profiler(f2)
+    solution = flx.broyden(p, feed, xtol=1e-8, maxiter=200)
+    assert_allclose(feed, original_feed)
+    assert_allclose(solution, real_solution2)
+    p.archive('Good Broyden')
+    
+    solution = flx.broyden(p, feed, xtol=1e-8, maxiter=200, method='bad')
+    assert_allclose(solution, real_solution2)
+    p.archive('Bad Broyden')
+    
+    solution = flx.broyden(p, feed, xtol=1e-8, maxiter=200, memory=2)
+    assert_allclose(solution, real_solution2)
+    p.archive('Limited memory Broyden')
+    
+    solution = flx.broyden(p, feed, xtol=1e-8, maxiter=200, line_search=True)
+    assert_allclose(solution, real_solution2)
+    p.archive('Broyden with line search')
+    assert p.sizes() == {'Good Broyden': 14, 'Bad Broyden': 10, 
+                         'Limited memory Broyden': 15, 
+                         'Broyden with line search': 61}
+    
+    # Updates after a restart satisfy the secant condition with respect to -I
+    A = np.array([[0.5, 0.2, 0.1], [0.1, 0.4, 0.2], [0.3, 0.1, 0.6]])
+    g = lambda x: A @ x + 1.
+    p = flx.Profiler(g)
+    for memory in (1, 2, 3, 10):
+        solution = flx.broyden(p, np.zeros(3), xtol=1e-10, maxiter=200, memory=memory)
+        assert_allclose(solution, np.linalg.solve(np.eye(3) - A, np.ones(3)))
+        p.archive(memory)
+    assert p.sizes() == {1: 32, 2: 21, 3: 23, 10: 7}
+    
 def test_conditional_fixedpoint_array_solvers():
     original_feed = feed.copy()
     
@@ -149,4 +218,231 @@ def test_conditional_fixedpoint_array_solvers():
     p.archive('Fixed point')
     
     assert p.sizes() == {'Wegstein': 5, 'Aitken': 5, 'Fixed point': 194}
-    
\ No newline at end of file
+        
+def test_batch_fixedpoint_solvers():
+    recycle = np.array([0.5, 0.7, 0.8, 0.9, 0.95])
+    X = np.tile(feed, (recycle.size, 1))
+    
+    def f_single(x, r):
+        reactor_feed = x + feed
+        effluent = reactor_feed + (reactor_feed[0] * stoichiometry * 0.7)
+        return effluent * r
+    
+    active_rows = []
+    def f_batch(x, index):
+        active_rows.append(index.size)
+        reactor_feed = x + feed
+        effluent = reactor_feed + (reactor_feed[:, :1] * stoichiometry * 0.7)
+        return effluent * recycle[index, None]
+    
+    for batch_solver, solver in ((flx.batch_wegstein, flx.wegstein),
+                                 (flx.batch_aitken, flx.aitken)):
+        active_rows.clear()
+        solution, iterations, status = batch_solver(f_batch, X, xtol=1e-8, maxiter=200)
+        assert_allclose(X, np.tile(feed, (recycle.size, 1)))
+        real_solutions = [solver(f_single, feed, xtol=1e-8, maxiter=200, args=(r,)) 
+                          for r in recycle]
+        assert_allclose(solution, real_solutions)
+        assert (status == flx.utils.CONVERGED).all()
+        assert iterations.max() > iterations.min() 
+        assert active_rows[-1] < recycle.size # Converged rows are frozen
+        
+        solution, iterations, status = batch_solver(f_batch, X, xtol=1e-8, maxiter=2)
+        assert (status == flx.utils.MAXITER_EXCEEDED).any()
+        with pytest.raises(RuntimeError):
+            batch_solver(f_batch, X, xtol=1e-8, maxiter=2, checkiter=True)
+    
+def test_inplace_fixedpoint_array_solvers():
+    original_feed = feed.copy()
+    p = flx.Profiler(f)
+    out = np.empty_like(feed)
+    solution = flx.wegstein(p, feed, xtol=1e-8, maxiter=200, out=out)
+    assert solution is out
+    assert_allclose(feed, original_feed)
+    assert_allclose(solution, real_solution)
+    p.archive('Wegstein')
+    
+    solution = flx.wegstein(p, feed, xtol=1e-8, maxiter=200, lb=-2., ub=3., exp=0.5, out=out)
+    assert_allclose(solution, real_solution)
+    p.archive('Bounded Wegstein')
+    
+    solution = flx.aitken(p, feed, xtol=1e-8, maxiter=200, out=out)
+    assert solution is out
+    assert_allclose(feed, original_feed)
+    assert_allclose(solution, real_solution)
+    p.archive('Aitken')
+    
+    q = flx.Profiler(f)
+    flx.wegstein(q, feed, xtol=1e-8, maxiter=200)
+    q.archive('Wegstein')
+    flx.wegstein(q, feed, xtol=1e-8, maxiter=200, lb=-2., ub=3., exp=0.5)
+    q.archive('Bounded Wegstein')
+    flx.aitken(q, feed, xtol=1e-8, maxiter=200)
+    q.archive('Aitken')
+    assert p.sizes() == q.sizes()
+    
+    with pytest.raises(RuntimeError):
+        flx.aitken(f2, feed, convergenceiter=4, xtol=1e-8, maxiter=200, out=out)
+    
+def test_convergence_monitor():
+    utils = flx.utils
+    monitor = utils.convergence_monitor(4, 0.05)
+    errors = [1., 0.5, 0.99, 0.49, 0.98, 0.48, 0.97]
+    status = [utils.monitor_convergence(monitor, i) for i in errors]
+    assert status == [0, 0, 0, 0, utils.OSCILLATING, utils.OSCILLATING, utils.OSCILLATING]
+    
+    monitor = utils.convergence_monitor(4)
+    status = [utils.monitor_convergence(monitor, i) for i in errors]
+    assert status == [0, 0, 0, 0, 0, 0, utils.DIVERGING]
+    
+    monitor = utils.convergence_monitor(3, 0.05)
+    status = [utils.monitor_convergence(monitor, 0.99 ** i) for i in range(5)]
+    assert status == [0, 0, 0, utils.STALLED, utils.STALLED]
+    assert_allclose(monitor.state[utils.RATIO], 0.99)
+    
+    slow = lambda x: 0.999 * x + 0.001
+    p = flx.Profiler(slow)
+    with pytest.raises(RuntimeError, match='stalled'):
+        flx.fixed_point(p, np.zeros(3), maxiter=500, convergenceiter=5, stalltol=0.01)
+    assert len(p.xs) == 6
+    solution = flx.fixed_point(slow, np.zeros(3), maxiter=500, convergenceiter=5,
+                               stalltol=0.01, checkconvergence=False)
+    assert (solution > 0.).all()
+    
+def test_parallel_array_kernels():
+    utils = flx.utils
+    rng = np.random.default_rng(0)
+    shape = (50, 20)
+    x, g1, g0 = rng.random((3, *shape))
+    dx = rng.random(shape) - 0.5
+    for lb, ub, exp in ((-np.inf, np.inf, 1.), (-0.5, 2., 0.5), (0.1, 0.8, 1.)):
+        assert_allclose(
+            utils.parallel_array_wegstein_iter(x, dx, g1, g0, lb, ub, exp),
+            utils.array_wegstein_iter(x, dx, g1, g0, lb, ub, exp), 
+            rtol=0, atol=0,
+        )
+    assert_allclose(
+        utils.parallel_array_aitken_iter(x, g1, dx, g0),
+        utils.array_aitken_iter(x, g1, dx, g0),
+        rtol=0, atol=0,
+    )
+    error = np.full(x.size, 1e-9)
+    assert utils.parallel_array_fixedpoint_converged(x, error, 1e-8, 0.)
+    error[-1] = 1.
+    assert not utils.parallel_array_fixedpoint_converged(x, error, 1e-8, 0.)
+    
+def test_newton_krylov():
+    original_feed = feed.copy()
+    p = flx.Profiler(f2)
+    solution = flx.newton_krylov(p, feed, xtol=1e-8, maxiter=200)
+    assert_allclose(feed, original_feed)
+    assert_allclose(solution, real_solution2)
+    p.archive('Newton-Krylov')
+    
+    solution = flx.newton_krylov(p, feed, xtol=1e-8, maxiter=200, line_search='inexact')
+    assert_allclose(solution, real_solution2)
+    p.archive('Newton-Krylov with inexact line search')
+    
+    solution = flx.newton_krylov(p, feed, xtol=1e-8, maxiter=200, line_search='exact')
+    assert_allclose(solution, real_solution2)
+    p.archive('Newton-Krylov with exact line search')
+    
+    solution = flx.newton_krylov(p, feed, xtol=1e-8, maxiter=200, line_search='backtracking')
+    assert_allclose(solution, real_solution2)
+    p.archive('Newton-Krylov with backtracking line search')
+    assert max(p.sizes().values()) < 20
+    
+    # Discretized Bratu problem: u'' + exp(u) = 0, u(0) = u(1) = 0
+    N = 100
+    h2 = 1. / (N + 1) ** 2
+    def bratu(u):
+        r = -2. * u + h2 * np.exp(u)
+        r[1:] += u[:-1]
+        r[:-1] += u[1:]
+        return r
+    u = flx.newton_krylov(bratu, np.zeros(N), xtol=1e-10, maxiter=500,
+                          fixedpoint=False, memory=N)
+    assert np.abs(bratu(u)).max() < 1e-10
+    assert_allclose(u.max(), 0.1405, atol=1e-3)
+    
+    assert_allclose(flx.newton_krylov(lambda x: x**3 - 8, 1., xtol=1e-12, fixedpoint=False), 2.)
+    with pytest.raises(ValueError):
+        flx.newton_krylov(f2, feed, line_search='golden')
+
+def test_profiler_storage():
+    def profile(storage, maxlen=None):
+        p = flx.Profiler(f, storage, maxlen)
+        flx.wegstein(p, feed, convergenceiter=4, xtol=1e-8, maxiter=200)
+        p.archive('Wegstein')
+        flx.fixed_point(p, feed, convergenceiter=4, xtol=5e-8, maxiter=200)
+        p.archive('Fixed point')
+        return p
+    
+    expected = {'Wegstein': 5, 'Fixed point': 194}
+    p_list = profile('list')
+    p_array = profile('array')
+    assert p_array.sizes() == p_list.sizes() == expected
+    for a, b in zip(p_list.active_archives, p_array.active_archives):
+        assert_allclose(a.xs, b.xs)
+        assert_allclose(a.ys, b.ys)
+    
+    p_ring = profile('ring', maxlen=10)
+    assert p_ring.sizes() == expected
+    for a, b in zip(p_list.active_archives, p_ring.active_archives):
+        assert_allclose(a.xs[-10:], b.xs)
+        assert_allclose(a.ys[-10:], b.ys)
+    
+    p_reductions = profile('reductions')
+    assert p_reductions.sizes() == expected
+    for a, b in zip(p_list.active_archives, p_reductions.active_archives):
+        assert_allclose(np.linalg.norm(a.xs, axis=1), b.xs)
+        assert_allclose(np.linalg.norm(a.ys, axis=1), b.ys[:, 0])
+        assert_allclose(np.linalg.norm(a.ys - a.xs, axis=1), b.ys[:, 1])
+    
+    # Failed evaluations are counted by all storages
+    def g(x):
+        if x > 1: raise RuntimeError('infeasible')
+        return x - 0.5
+    for storage in ('list', 'array', 'ring', 'reductions'):
+        p = flx.Profiler(g, storage, 5 if storage == 'ring' else None)
+        with pytest.raises(RuntimeError):
+            flx.secant(p, 0., 2.)
+        p.archive('a')
+        assert p.sizes() == {'a': 2}
+        assert_allclose(p.active_archives[0].xs, [0., 2.])
+        if storage != 'list': assert np.isnan(p.active_archives[0].ys[-1]).all()
+    
+    with pytest.raises(ValueError):
+        flx.Profiler(f, 'ring')
+    with pytest.raises(ValueError):
+        flx.Profiler(f, 'deque')
+
+def test_stream_storage(tmp_path):
+    p_list = flx.Profiler(f)
+    p_stream = flx.Profiler(f, flx.StreamStorage(tmp_path, chunksize=7))
+    for p in (p_list, p_stream):
+        flx.wegstein(p, feed, convergenceiter=4, xtol=1e-8, maxiter=200)
+        p.archive_case('Wegstein')
+        flx.fixed_point(p, feed, convergenceiter=4, xtol=5e-8, maxiter=200)
+        p.archive_case('Fixed point', failed=True)
+        flx.aitken(p, feed, convergenceiter=4, xtol=1e-8, maxiter=200)
+    assert_allclose(p_stream.xs, np.array(p_list.xs))
+    assert_allclose(p_stream.ys, np.array(p_list.ys))
+    p_stream.storage.clear()
+    assert not [i for i in os.listdir(tmp_path) if i.startswith('archive000002')]
+    
+    # Archives are appended to existing streams
+    p = flx.Profiler(f, flx.StreamStorage(tmp_path, chunksize=7))
+    flx.wegstein(p, feed, convergenceiter=4, xtol=1e-8, maxiter=200)
+    p.archive('Wegstein')
+    
+    archives = flx.load_archives(tmp_path)
+    assert [(i.name, i.kind, len(i)) for i in archives] == [
+        ('Wegstein', 'passed', 5), ('Fixed point', 'failed', 194), ('Wegstein', 'active', 5)
+    ]
+    expected = p_list.passed_cases + p_list.failed_cases + p_list.passed_cases
+    for a, b in zip(expected, archives):
+        assert_allclose(a.xs, b.xs)
+        assert_allclose(a.ys, b.ys)
+        assert (np.diff(b.times) >= 0).all()
+    assert [i.name for i in flx.load_archives(tmp_path, 'failed')] == ['Fixed point']
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for line searches and bounded minimizers.
+
+"""
+import flexsolve as flx 
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+def test_brent_minimize():
+    x, fx, evaluations = flx.brent_minimize(lambda x: (x - 1.) ** 2 + 3., -2., 5.)
+    assert_allclose([x, fx], [1., 3.])
+    assert evaluations == 6
+    
+    x, fx, evaluations = flx.brent_minimize(np.sin, -2., 5., 1e-8)
+    assert_allclose([x, fx], [-np.pi / 2, -1.], atol=1e-8)
+    
+    x, fx, evaluations = flx.brent_minimize(lambda x, a: abs(x - a), -2., 5., 1e-6, (0.3,))
+    assert_allclose(x, 0.3, atol=1e-6)
+    
+    x, fx, evaluations = flx.brent_minimize(lambda x: (x - 1.) ** 2, -2., 5., 1e-12, maxiter=5)
+    assert evaluations == 5
+
+def test_exact_line_search():
+    target = np.array([1., 2.])
+    f = lambda x: ((x - target) ** 2).sum()
+    result = flx.exact_line_search(f, np.zeros(2), np.array([0.8, 1.6]))
+    assert_allclose(result.t, 1.25, rtol=1e-5)
+    assert_allclose(result.x, target, rtol=1e-5)
+    assert_allclose(result.r, 0., atol=1e-9)
+    assert 0 < result.evaluations <= 20
+
+def test_inexact_line_search():
+    target = np.array([1., 2.])
+    f = lambda x: ((x - target) ** 2).sum()
+    calls = []
+    def counted(x):
+        calls.append(x)
+        return f(x)
+    result = flx.inexact_line_search(counted, np.zeros(2), target)
+    assert result.r < f(np.zeros(2))
+    assert result.evaluations == len(calls)
+
+def test_backtracking_line_search():
+    def rosenbrock(x): 
+        return (1. - x[0]) ** 2 + 100. * (x[1] - x[0] ** 2) ** 2
+    def gradient(x): 
+        return np.array([-2. * (1. - x[0]) - 400. * x[0] * (x[1] - x[0] ** 2), 
+                         200. * (x[1] - x[0] ** 2)])
+    x = np.array([-1.2, 1.])
+    correction = -gradient(x)
+    fx = rosenbrock(x)
+    slope = gradient(x) @ correction
+    for condition in ('armijo', 'wolfe'):
+        for df in (None, gradient):
+            result = flx.backtracking_line_search(
+                rosenbrock, x, correction, fx=fx, condition=condition, df=df
+            )
+            assert result.r <= fx + 1e-4 * result.t * slope
+            assert_allclose(result.x, x + result.t * correction)
+            if condition == 'wolfe':
+                assert abs(gradient(result.x) @ correction) <= -0.9 * slope
+            
+    # The full step is accepted with a single evaluation
+    q = lambda x: ((x - 1.) ** 2).sum()
+    dq = lambda x: 2. * (x - 1.)
+    for condition in ('armijo', 'wolfe'):
+        result = flx.backtracking_line_search(
+            q, np.zeros(3), np.ones(3), fx=3., condition=condition, df=dq
+        )
+        assert result.t == 1. and result.evaluations == 1
+    
+    # Infeasible points are backtracked
+    q_infeasible = lambda x: q(x) if x[0] < 0.3 else np.inf
+    result = flx.backtracking_line_search(q_infeasible, np.zeros(3), np.ones(3), df=dq)
+    assert result.t < 0.3 and result.r < 3.
+    
+    with pytest.raises(ValueError):
+        flx.backtracking_line_search(q, np.zeros(3), -np.ones(3), df=dq)
+
+def test_vectorized_line_search():
+    target = np.array([1., 2.])
+    calls = []
+    def f(X):
+        calls.append(X.shape)
+        return ((X - target) ** 2).sum(axis=1)
+    for method, points in (('grid', 8), ('golden', 2)):
+        calls.clear()
+        result = flx.vectorized_line_search(
+            f, np.zeros(2), np.array([0.8, 1.6]), t1=2., ttol=1e-6, 
+            maxiter=50, method=method
+        )
+        assert_allclose(result.t, 1.25, rtol=1e-6)
+        assert_allclose(result.x, target, rtol=1e-6)
+        assert all([i == (points, 2) for i in calls])
+        assert result.evaluations == points * len(calls)
+    
+    # Infeasible (nan) points are ignored
+    f_infeasible = lambda X: np.where(X[:, 0] < 0.6, ((X - target) ** 2).sum(axis=1), np.nan)
+    result = flx.vectorized_line_search(f_infeasible, np.zeros(2), np.array([0.8, 1.6]), t1=2.)
+    assert result.x[0] < 0.6 and np.isfinite(result.r)
+    
+    # Merits returned by f are not modified
+    merits = []
+    def f_cached(X):
+        merits.append(f_infeasible(X))
+        return merits[-1]
+    flx.vectorized_line_search(f_cached, np.zeros(2), np.array([0.8, 1.6]), t1=2.)
+    assert any([np.isnan(i).any() for i in merits])
+    
+    with pytest.raises(ValueError):
+        flx.vectorized_line_search(f, np.zeros(2), target, method='newton')
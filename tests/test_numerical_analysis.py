@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for condition number estimation.
+
+"""
+import flexsolve as flx 
+import numpy as np
+from numpy.testing import assert_allclose
+
+def f0(x0):
+    return x0[0] ** 2 - x0[1] ** 0.5 + 5  
+
+def f1(x1):
+    return x1[0] ** 0.8 - x1[1] ** 3
+
+def f(x):
+    return np.array([f0(x[:2]), f1(x[2:])])
+
+def test_independent_functions_condition_number():
+    x = np.array([2, 3, 0.5, -1])
+    kappa = flx.function_condition_number(f, x)
+    kappa_blocks = flx.independent_functions_condition_number((f0, x[:2]), (f1, x[2:]))
+    assert_allclose(kappa_blocks, kappa)
+    kappa_blocks = flx.independent_functions_condition_number(
+        (f0, x[:2]), (f1, x[2:]), power_iterations=50
+    )
+    assert_allclose(kappa_blocks, kappa)
+
+def test_block_diagonal_norm():
+    rng = np.random.default_rng(0)
+    blocks = [rng.random((i, i + 1)) for i in range(1, 20)]
+    dense = np.zeros((sum([i.shape[0] for i in blocks]), sum([i.shape[1] for i in blocks])))
+    m = n = 0
+    for J in blocks:
+        dense[m:m + J.shape[0], n:n + J.shape[1]] = J
+        m += J.shape[0]
+        n += J.shape[1]
+    expected = np.linalg.norm(dense, 2)
+    assert_allclose(flx.block_diagonal_norm(blocks), expected)
+    assert_allclose(flx.block_diagonal_norm(blocks, power_iterations=500), expected, rtol=1e-5)
+    assert flx.estimate_norm(np.zeros((3, 3))) == 0.
+
+def test_sparse_jacobian():
+    from scipy.differentiate import jacobian
+    N = 100
+    h2 = 1. / (N + 1) ** 2
+    evaluations = []
+    def bratu(u):
+        evaluations.append(u)
+        r = -2. * u + h2 * np.exp(u)
+        r[1:] += u[:-1]
+        r[:-1] += u[1:]
+        return r
+    u = np.linspace(0, 1, N)
+    sparsity = flx.jacobian_sparsity(bratu, u)
+    assert sparsity.nnz == 3 * N - 2
+    colors = flx.color_columns(sparsity)
+    # Columns of the same color do not share rows
+    S = sparsity.toarray()
+    for color in range(colors.max() + 1):
+        assert S[:, colors == color].sum(axis=1).max() <= 1
+    J = flx.SparseJacobian(bratu, sparsity=sparsity)
+    assert J.ncolors == 3
+    evaluations.clear()
+    Js = J(u)
+    assert len(evaluations) == 4
+    assert_allclose(Js.toarray(), jacobian(bratu, u).df, atol=1e-6)
+    
+    rng = np.random.default_rng(0)
+    A = (rng.random((50, 50)) < 0.05) * rng.random((50, 50)) + np.eye(50)
+    f = lambda x: A @ np.sin(x)
+    J = flx.SparseJacobian(f, np.ones(50))
+    assert J.ncolors < 50
+    assert_allclose(J(np.zeros(50)).toarray(), A, atol=1e-6)
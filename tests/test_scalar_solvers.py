@@ -8,9 +8,10 @@
 """
 """
 import os
-from math import log, exp, erf, pi, sin, cos
+from math import log, exp, erf, pi, sin, cos, atan
 from numba import njit
 import numpy as np
+from numpy.testing import assert_allclose
 import flexsolve as flx
 import pytest
 
@@ -252,6 +253,96 @@ def test_scalar_solvers():
     summary_array = test_problems.summary_array(solvers, tol=1e-10, solver_kwargs=kwargs)
     assert np.allclose(summary_array, summary_values)
    
+def test_derivative_solvers():
+    f = lambda x: (x**3 - 40 + 2*x, 3*x**2 + 2, 6*x)
+    assert_allclose(flx.newton(lambda x: f(x)[:2], 0.), 3.2252404627917794, rtol=1e-8)
+    assert_allclose(flx.halley(f, 0.), 3.2252404627917794, rtol=1e-8)
+    # Newton's method diverges for atan(x) when abs(x0) > 1.39 unless bracketed
+    g = lambda x: (atan(x), 1 / (1 + x*x), -2*x / (1 + x*x)**2)
+    assert abs(flx.newton(lambda x: g(x)[:2], 1.5)) < 1e-8
+    assert abs(flx.halley(g, 3.)) < 1e-8
+   
+def test_jit_profiler():
+    @njit
+    def f(x): return x ** 3 - 8
+    
+    @njit
+    def solve_secant(f, recorder):
+        return flx.secant(f, 1., 3., xtol=1e-12, args=(recorder,))
+    
+    @njit
+    def solve_IQ(f, recorder):
+        return flx.IQ_interpolation(f, 0., 5., xtol=1e-12, args=(recorder,))
+    
+    p = flx.Profiler(f)
+    flx.secant(p, 1., 3., xtol=1e-12)
+    p.archive('Secant')
+    flx.IQ_interpolation(p, 0., 5., xtol=1e-12)
+    p.archive('IQ')
+    
+    jp = flx.JitProfiler(f, 1., capacity=5)
+    assert_allclose(solve_secant(jp.f, jp.recorder), 2.)
+    jp.archive('Secant')
+    assert_allclose(solve_IQ(jp.f, jp.recorder), 2.)
+    jp.archive('IQ')
+    assert jp.sizes() == p.sizes()
+    for a, b in zip(p.active_archives, jp.active_archives):
+        assert_allclose(a.xs[-5:], b.xs)
+        assert_allclose(a.ys[-5:], b.ys)
+   
+def test_profiler_timing():
+    results = julia_problems.results_array(solvers, tol=1e-10, solver_kwargs=kwargs)
+    timed_results = julia_problems.results_array(solvers, tol=1e-10, solver_kwargs=kwargs, timing=True)
+    fields = len(flx.problem_list.timing_fields)
+    assert timed_results.shape == (results.shape[0] + fields * len(julia_problems), results.shape[1])
+    timed_results = timed_results.reshape([len(julia_problems), 3 + fields, -1])
+    assert_allclose(timed_results[:, :3].reshape(results.shape), results)
+    assert (timed_results[:, 3:] >= 0).all()
+    
+    # Failed cases are timed too
+    failing_problems = flx.ProblemList()
+    failing_problems.add_problem(lambda x: x ** 3 - 8, cases=[1., 10., 100.])
+    timed_results = failing_problems.results_array([flx.secant], tol=1e-10, solver_kwargs=[{'maxiter': 1}], timing=True)
+    iterations, passed, failed, *timing = timed_results[:, 0]
+    assert passed == 0 and failed == 3
+    assert np.isfinite(timing).all() and timing[0] > 0
+    
+    p = flx.Profiler(lambda x: x ** 3 - 8, timing=True)
+    flx.secant(p, 1., 3., xtol=1e-12)
+    p.archive('Secant')
+    timings = p.active_archives[0].timings
+    assert timings.shape == (len(p.active_archives[0]), 2)
+    stats = p.timing_stats(percentiles=[0, 100])
+    latencies = timings[:, 1] - timings[:, 0]
+    assert_allclose(stats['Time in f'], latencies.sum())
+    assert_allclose(stats['Latency p0'], latencies.min())
+    assert_allclose(stats['Latency p100'], latencies.max())
+    assert stats['Time between calls'] > 0
+   
+def test_convergence_analysis():
+    f = lambda x: x ** 3 - 8
+    p = flx.Profiler(f)
+    for x0 in (1., 3., 10.):
+        flx.secant(p, x0, xtol=0., ytol=1e-14)
+        p.archive_case(x0)
+    analysis = p.convergence_analysis(tol=1e-8)
+    assert_allclose(analysis.order, (1 + 5 ** 0.5) / 2, rtol=0.05)
+    assert analysis.contraction < 1e-4
+    assert analysis.evaluations == 10
+    
+    # Linear convergence at rate |g'(x)| for fixed point iteration
+    g = lambda x: 0.5 * np.cos(x)
+    p = flx.Profiler(g, storage='ring', maxlen=5)
+    x = flx.fixed_point(p, 1., xtol=1e-12, maxiter=200)
+    p.archive_case('Fixed point')
+    order, contraction, preasymptotic, evaluations = p.passed_cases[0].convergence_analysis(tol=1e-6, fixedpoint=True)
+    assert_allclose(order, 1., rtol=1e-3)
+    assert_allclose(contraction, abs(0.5 * np.sin(x)), rtol=1e-3)
+    assert np.isnan(evaluations) # Evaluations reaching tolerance were not stored
+    
+    analysis = flx.convergence_analysis([4, 5, 1, 0.5, 0.25, 0.125, 0.25], tol=0.3, offset=2)
+    assert analysis == (1., 0.5, 1, 7)
+   
 # @pytest.mark.slow
 # def test_scalar_solvers_with_numba():
 #     # This test takes about 15 sec because we are compiling 
@@ -301,4 +392,4 @@ if __name__ == '__main__':
     df_summary = test_problems.summary_df(solvers,
                                           tol=1e-10,
                                           solver_kwargs=kwargs,
-                                          solver_names=solver_names)
\ No newline at end of file
+                                          solver_names=solver_names)
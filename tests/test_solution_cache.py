@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+"""
+import flexsolve as flx
+import numpy as np
+from numpy.testing import assert_allclose
+
+def test_solution_cache():
+    f = lambda x, a: x**3 - 40 + a*x
+    cache = flx.SolutionCache(maxsize=4)
+    evaluations = []
+    counter = [0]
+    def g(x, a):
+        counter[0] += 1
+        return f(x, a)
+    for a in np.linspace(2, 3, 6):
+        counter[0] = 0
+        x = cache.bounded_solve(flx.IQ_interpolation, g, -10, 20, args=(a,))
+        evaluations.append(counter[0])
+        assert_allclose(x, flx.IQ_interpolation(f, -10, 20, args=(a,)), rtol=1e-6)
+    assert max(evaluations[1:]) < evaluations[0]
+    for a in np.linspace(2, 3, 6):
+        x = cache.open_solve(flx.secant, g, 0., args=(a + 0.05,))
+        assert_allclose(f(x, a + 0.05), 0., atol=5e-8)
+    assert cache.cache_info() == flx.CacheInfo(hits=11, misses=1, maxsize=4, currsize=4)